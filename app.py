@@ -8,9 +8,30 @@ import streamlit as st
 import pandas as pd
 import os
 import datetime
-from src.reviews_fetcher import get_place_id_from_name, fetch_reviews, fetch_general_place_data
+import functools
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from src.reviews_fetcher import (
+    get_place_id_from_name, fetch_reviews, fetch_reviews_multilang, fetch_reviews_resumable,
+    fetch_general_place_data, discover_places
+)
 from src.text_processing import clean_text
-from src.sentiment_analysis import analyze_sentiment
+from src.sentiment_analysis import score_sentiment_batch, label_polarities, POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD
+from src.language_detection import detect_languages
+from src.pipeline import run_pipeline
+from src.review_table import build_review_index, filter_reviews, paginate
+from src.exports import available_formats, build_export, export_file_name
+from src.map_layers import build_map_layers
+from src.text_index import InvertedIndex
+from src.rollups import RollupStore
+from src.job_journal import JobJournal, job_id
+from src.result_cache import ResultCache, cache_key
+from src.dedup import MinHashIndex
+from src.sql_engine import SQLEngine, is_available as sql_disponible
+from src.place_similarity import place_similarity, is_available as similitud_disponible
+from src.profiling import (
+    stage, is_enabled, reset_stats, stage_summary, top_functions, dump_pstats, collapsed_stacks
+)
 import pydeck as pdk
 
 # JuancaM - Se agregan las librerías necesarias para generar la WordCloud y personalizarla.
@@ -67,6 +88,93 @@ def generar_wordcloud(df):
     ax.axis("off")
     st.pyplot(fig)
 
+# --------------------------------------------------------------------------------
+# Descarga de reseñas en uno o varios idiomas.
+# --------------------------------------------------------------------------------
+def descargar_resenas(place_id, language, journal=None, job_key=None):
+    """
+    Descarga las reseñas de un lugar en uno o varios idiomas.
+    Si 'language' es una lista, las consultas se hacen en paralelo y las reseñas
+    se combinan eliminando duplicados (mismo autor y fecha).
+    Con un 'journal', cada página descargada se anota y, si hubo una ejecución
+    interrumpida, se continúa desde la última página guardada (solo un idioma); si el
+    token guardado ya venció, se vuelve a descargar desde la primera página.
+    Retorna (reseñas, nombre del lugar, status); status es "OK" solo si la descarga terminó.
+    """
+    if isinstance(language, list):
+        return fetch_reviews_multilang(place_id, languages=language, with_status=True)
+    if journal is None:
+        return fetch_reviews(place_id, language=language, with_status=True)
+    return fetch_reviews_resumable(place_id, journal, job_key, language=language)
+
+# --------------------------------------------------------------------------------
+# Botones de descarga: el archivo solo se genera cuando el usuario hace clic.
+# --------------------------------------------------------------------------------
+def boton_descarga(df, label, base_name, key):
+    """
+    Muestra un botón de descarga con opciones de formato y compresión.
+    El archivo se serializa de forma diferida (al hacer clic) y se reutiliza
+    desde caché si los datos no cambiaron.
+    """
+    col_fmt, col_gz, col_btn = st.columns([1, 1, 3])
+    with col_fmt:
+        fmt = st.selectbox("Formato", available_formats(), key=f"{key}_fmt", label_visibility="collapsed")
+    with col_gz:
+        compress = st.checkbox("gzip", key=f"{key}_gzip")
+    file_name, mime = export_file_name(base_name, fmt, compress)
+    with col_btn:
+        st.download_button(
+            label,
+            functools.partial(build_export, df, fmt, compress),
+            file_name,
+            mime,
+            key=key,
+            on_click="ignore"
+        )
+
+# --------------------------------------------------------------------------------
+# Índice de búsqueda por palabras clave sobre todas las reseñas recopiladas.
+# Se comparte entre sesiones y se guarda en data/index.
+# --------------------------------------------------------------------------------
+@st.cache_resource
+def cargar_indice():
+    return InvertedIndex("data/index/reviews_index")
+
+# Caché de resultados por lugar e idioma compartido por todas las sesiones del servidor.
+# Se configura con RESULT_CACHE_TTL (segundos), RESULT_CACHE_MAX_MB y RESULT_CACHE_DIR (opcional).
+@st.cache_resource
+def cargar_cache_resultados():
+    return ResultCache(
+        ttl_seconds=int(os.getenv("RESULT_CACHE_TTL", "3600")),
+        max_bytes=int(os.getenv("RESULT_CACHE_MAX_MB", "256")) * 1024 * 1024,
+        disk_dir=os.getenv("RESULT_CACHE_DIR") or None
+    )
+
+# Firmas MinHash de todas las reseñas recopiladas, para detectar casi duplicados
+@st.cache_resource
+def cargar_dedup():
+    return MinHashIndex("data/dedup/minhash")
+
+# Agregados por lugar y día para las gráficas de tendencias (compartidos entre sesiones)
+@st.cache_resource
+def cargar_rollups():
+    return RollupStore("data/rollups")
+
+# Motor SQL (DuckDB) sobre los CSV guardados; requiere el paquete opcional duckdb
+@st.cache_resource
+def cargar_motor_sql():
+    return SQLEngine()
+
+# --------------------------------------------------------------------------------
+# Perfilado por etapas (opcional): se activa con PROFILE_STAGES=1 o desde la barra lateral.
+# Cada etapa marcada con stage() se perfila con cProfile y se acumula entre ejecuciones.
+# --------------------------------------------------------------------------------
+st.sidebar.markdown("### 🩺 Perfilado")
+# El interruptor es de cada sesión: PROFILE_STAGES solo define su valor inicial
+perfilar = st.sidebar.toggle("Perfilar etapas (cProfile)", value=is_enabled(), key="perfilado")
+# Las estadísticas también son de cada sesión: "Reiniciar perfil" solo borra las propias
+sesion_perfil = st.session_state.setdefault("perfil_sesion", uuid.uuid4().hex)
+
 # --------------------------------------------------------------------------------
 # Encabezado principal (HTML) para darle estilo al título y subtítulo
 # --------------------------------------------------------------------------------
@@ -77,6 +185,44 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
+# --------------------------------------------------------------------------------
+# Modo descubrimiento: busca todos los lugares de un tipo dentro de una zona
+# (rectángulo de coordenadas) y los agrega como "pid:" a la lista de lugares.
+# --------------------------------------------------------------------------------
+def descubrir_lugares():
+    """
+    Callback del botón de descubrimiento. Se ejecuta antes de dibujar el área de texto,
+    por lo que puede reemplazar su contenido con los place_id encontrados.
+    """
+    bbox = (
+        st.session_state["disc_south"], st.session_state["disc_west"],
+        st.session_state["disc_north"], st.session_state["disc_east"]
+    )
+    encontrados = discover_places(
+        bbox,
+        place_type=st.session_state["disc_type"].strip(),
+        keyword=st.session_state["disc_keyword"].strip(),
+        grid_size=st.session_state["disc_grid"]
+    )
+    existentes = [line for line in st.session_state.get("places_input", "").split("\n") if line.strip()]
+    nuevos = [f"pid:{p['place_id']}" for p in encontrados]
+    st.session_state["places_input"] = "\n".join(list(dict.fromkeys(existentes + nuevos)))
+    st.session_state["disc_result"] = len(encontrados)
+
+with st.expander("🛰️ Descubrir lugares en una zona"):
+    d_col1, d_col2, d_col3, d_col4 = st.columns(4)
+    d_col1.number_input("Latitud sur", value=19.40, format="%.5f", key="disc_south")
+    d_col2.number_input("Longitud oeste", value=-99.20, format="%.5f", key="disc_west")
+    d_col3.number_input("Latitud norte", value=19.45, format="%.5f", key="disc_north")
+    d_col4.number_input("Longitud este", value=-99.15, format="%.5f", key="disc_east")
+    d_col5, d_col6, d_col7 = st.columns(3)
+    d_col5.text_input("Tipo de lugar (Google)", value="restaurant", key="disc_type")
+    d_col6.text_input("Palabra clave (opcional)", key="disc_keyword")
+    d_col7.number_input("Celdas por lado", min_value=1, max_value=20, value=4, key="disc_grid")
+    st.button("🔎 Buscar lugares en la zona", on_click=descubrir_lugares)
+    if "disc_result" in st.session_state:
+        st.success(f"Se encontraron {st.session_state['disc_result']} lugares; se agregaron a la lista de abajo.")
+
 # Sección de entrada de datos: lugares a analizar
 st.markdown("### 🧭 Escribe los lugares que quieres analizar (uno por línea):")
 col_left, col_right = st.columns([3, 1])
@@ -86,10 +232,11 @@ with col_left:
     places_input = st.text_area(" ", height=120, key="places_input")
 with col_right:
     # Desplegable para seleccionar el idioma de las reseñas
-    idioma = st.selectbox("Idioma de reseñas:", options=["Predeterminado", "Español", "Inglés"], index=0)
+    idioma = st.selectbox("Idioma de reseñas:", options=["Predeterminado", "Español", "Inglés", "Español + Inglés"], index=0)
 
-# Se mapea la elección de idioma a los códigos que la API puede utilizar
-idioma_map = {"Predeterminado": "", "Español": "es", "Inglés": "en"}
+# Se mapea la elección de idioma a los códigos que la API puede utilizar.
+# Una lista indica que se consultan varios idiomas a la vez y se combinan las reseñas.
+idioma_map = {"Predeterminado": "", "Español": "es", "Inglés": "en", "Español + Inglés": ["es", "en"]}
 
 # Margen visual
 st.markdown("<br>", unsafe_allow_html=True)
@@ -102,51 +249,134 @@ with btn_col:
 # --------------------------------------------------------------------------------
 # Al hacer clic en "Analizar Opiniones", se desencadena el siguiente bloque:
 # 1. Se leen las líneas ingresadas, determinando si se trata de un place_id o un nombre.
-# 2. Se llama a las funciones para obtener información y reseñas del lugar.
+# 2. Se descargan en paralelo (hilos) la información y reseñas de cada lugar, y las
+#    reseñas se limpian y analizan en procesos separados a medida que llegan.
 # 3. Se almacenan los resultados en el estado de la sesión y se guardan en CSV.
 # --------------------------------------------------------------------------------
 if procesar:
-    all_reviews = []   # Almacena todas las reseñas de todos los lugares
-    general_data = []  # Almacena información general de cada lugar
-    lines = places_input.split("\n")  # Separa la entrada por líneas
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            # Si la línea está vacía, se omite
-            continue
-        
+    lines = [line.strip() for line in places_input.split("\n") if line.strip()]  # Omite líneas vacías
+    avisos = []  # Los hilos de descarga no pueden escribir en la página; se muestran al final
+    language = idioma_map[idioma]
+
+    # Bitácora del trabajo: si una ejecución anterior con los mismos lugares e idioma
+    # se interrumpió, se reutiliza lo ya descargado.
+    journal = JobJournal(f"data/jobs/job_{job_id(lines, language)}.jsonl")
+    if journal.completed_count():
+        st.info(f"♻️ Reanudando ejecución interrumpida: {journal.completed_count()} lugar(es) ya completados.")
+
+    def resolver_linea(line):
+        """
+        Convierte una línea de entrada en un place_id (o None si no se encuentra).
+        """
         # Caso 1: el usuario ingresa directamente el place_id con prefijo "pid:"
         if line.startswith("pid:"):
-            place_id = line.replace("pid:", "").strip()
-            st.info(f"📥 Descargando reseñas para place_id={place_id}..")
-            # Se obtienen las reseñas y el nombre del lugar
-            revs, loc_name = fetch_reviews(place_id, language=idioma_map[idioma])
-            # Se obtiene la información general del lugar
-            general_info = fetch_general_place_data(place_id)
+            return line.replace("pid:", "").strip()
+        # Caso 2: el usuario ingresa el nombre de un lugar
+        place_id, name, addr = get_place_id_from_name(line)
+        if not place_id:
+            # Si no se encuentra un place_id para ese nombre, emitimos una alerta
+            avisos.append(f"No se encontró place_id para '{line}'")
+        return place_id
+
+    fallidos = {}  # place_id -> motivo; estos lugares no se marcan como completados
+
+    def procesar_lugar(place_id):
+        """
+        Obtiene (reseñas, información general) para un place_id.
+        Se ejecuta en un hilo de la etapa de I/O del pipeline.
+        Solo se anota como completado si ambas consultas respondieron OK; si no, el lugar
+        queda pendiente (o parcial) en la bitácora y se reintenta en la siguiente ejecución.
+        """
+        previo = journal.completed(place_id)
+        if previo is not None:
+            return previo
+        revs, loc_name, status = descargar_resenas(place_id, language, journal=journal, job_key=place_id)
+        general_info = fetch_general_place_data(place_id)
+        if status != "OK":
+            fallidos[place_id] = f"reseñas incompletas ({status})"
+        elif not general_info:
+            fallidos[place_id] = "sin información general"
         else:
-            # Caso 2: el usuario ingresa el nombre de un lugar
-            st.info(f"🔍 Recopilando datos para '{line}'...")
-            p_id, name, addr = get_place_id_from_name(line)
-            if p_id:
-                revs, loc_name = fetch_reviews(p_id, language=idioma_map[idioma])
-                general_info = fetch_general_place_data(p_id)
-            else:
-                # Si no se encuentra un place_id para ese nombre, emitimos una alerta
-                st.warning(f"No se encontró place_id para '{line}'")
-                revs = []
-                general_info = {}
-
-        # Si se obtuvo información general del lugar, la almacenamos
+            journal.record_done(place_id, revs, general_info)
+        return revs, general_info
+
+    # Primero se resuelven todos los nombres y se eliminan los lugares repetidos
+    # (p. ej. un nombre y un "pid:" que apuntan al mismo lugar) antes de descargar.
+    with st.spinner(f"🔍 Buscando {len(lines)} lugar(es)..."), stage("resolver_lugares", perfilar, sesion_perfil):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            resueltos = [pid for pid in executor.map(resolver_linea, lines) if pid]
+    place_ids = list(dict.fromkeys(resueltos))
+    if len(place_ids) < len(resueltos):
+        st.info(f"Se omitieron {len(resueltos) - len(place_ids)} lugar(es) repetidos.")
+
+    # Los lugares que otra sesión ya procesó recientemente se toman del caché compartido
+    cache = cargar_cache_resultados()
+    en_cache = {}
+    for place_id in place_ids:
+        valor = cache.get(cache_key(place_id, language))
+        if valor is not None:
+            en_cache[place_id] = valor
+    pendientes = [place_id for place_id in place_ids if place_id not in en_cache]
+    if en_cache:
+        st.info(f"⚡ {len(en_cache)} lugar(es) tomados del caché.")
+
+    progreso = st.progress(0.0, text=f"📥 Descargando reseñas de {len(pendientes)} lugar(es)...")
+    completados = []
+
+    def lugar_terminado(place_id, revs, general_info):
+        completados.append(place_id)
+        nombre = general_info.get("name") if general_info else place_id
+        progreso.progress(len(completados) / len(pendientes), text=f"✅ {nombre}: {len(revs)} reseñas")
+
+    with stage("pipeline", perfilar, sesion_perfil):
+        all_reviews, general_data = run_pipeline(
+            pendientes, procesar_lugar, on_place_done=lugar_terminado, profile=perfilar
+        )
+
+    # Se guardan en el caché los resultados ya enriquecidos de cada lugar descargado.
+    # Los lugares que fallaron (cuota, red) no se guardan para no ocultarlos a otras sesiones.
+    reviews_por_lugar = {place_id: [] for place_id in pendientes}
+    for review in all_reviews:
+        reviews_por_lugar.setdefault(review["place_id"], []).append(review)
+    general_por_lugar = {info["place_id"]: info for info in general_data}
+    for place_id in pendientes:
+        if place_id in fallidos:
+            continue
+        cache.set(cache_key(place_id, language), (reviews_por_lugar[place_id], general_por_lugar.get(place_id, {})))
+    for revs, general_info in en_cache.values():
+        all_reviews.extend(revs)
         if general_info:
             general_data.append(general_info)
-        # Agregamos las reseñas al listado total
-        all_reviews.extend(revs)
+    for aviso in avisos:
+        st.warning(aviso)
+    if fallidos:
+        st.warning(
+            f"⚠️ {len(fallidos)} lugar(es) no se descargaron completos; vuelve a ejecutar el análisis "
+            "con los mismos lugares para reintentarlos:\n" + "\n".join(
+                f"- {place_id}: {motivo}" for place_id, motivo in fallidos.items()
+            )
+        )
+
+    # Se indexan las reseñas nuevas para la búsqueda por palabras clave
+    with stage("indexado", perfilar, sesion_perfil):
+        indice = cargar_indice()
+        if indice.add_reviews(all_reviews):
+            indice.save()
 
     # Se guarda la información en el estado de la sesión (session_state)
     st.session_state["df"] = pd.DataFrame(all_reviews)
     st.session_state["df_info"] = pd.DataFrame(general_data)
 
+    # Se marcan las reseñas casi duplicadas (copiadas o de plantilla) contra todo el histórico
+    if not st.session_state["df"].empty:
+        with stage("dedup", perfilar, sesion_perfil):
+            dedup = cargar_dedup()
+            st.session_state["df"]["duplicate_of"] = dedup.check_and_add(
+                st.session_state["df"]["review_id"].tolist(),
+                st.session_state["df"]["text_clean"].fillna("").tolist()
+            )
+            dedup.save()
+
     # Se generan sellos de tiempo para diferenciar los archivos CSV
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
@@ -160,6 +390,34 @@ if procesar:
     if not st.session_state["df"].empty:
         os.makedirs("data/last5perplace", exist_ok=True)
         st.session_state["df"].to_csv(f"data/last5perplace/reviews_last5_{timestamp}.csv", index=False)
+        # Se actualizan los agregados diarios con las reseñas nuevas
+        with stage("rollups", perfilar, sesion_perfil):
+            cargar_rollups().update(st.session_state["df"])
+
+    # Los resultados ya están guardados: la bitácora del trabajo ya no es necesaria,
+    # salvo que queden lugares por reintentar
+    if not fallidos:
+        journal.finish()
+
+# --------------------------------------------------------------------------------
+# Umbrales de sentimiento (barra lateral)
+# Las etiquetas se recalculan de forma vectorizada a partir de las polaridades guardadas,
+# sin volver a ejecutar el análisis de texto.
+# --------------------------------------------------------------------------------
+st.sidebar.markdown("### ⚖️ Umbrales de Sentimiento")
+umbral_positivo = st.sidebar.slider("Polaridad mínima para 'positive'", 0.0, 1.0, POSITIVE_THRESHOLD, 0.05)
+umbral_negativo = st.sidebar.slider("Polaridad máxima para 'negative'", -1.0, 0.0, NEGATIVE_THRESHOLD, 0.05)
+
+if "df" in st.session_state and not st.session_state["df"].empty:
+    df = st.session_state["df"]
+    if "polarity" not in df.columns:
+        # El pipeline ya entrega los puntajes; esto solo cubre datos cargados de otra forma
+        df["text_clean"] = df["text"].apply(clean_text)          # Limpieza de texto
+        df["detected_language"] = detect_languages(df["text_clean"].tolist())  # Idioma por lotes
+        puntajes = score_sentiment_batch(df["text_clean"].tolist(), df["detected_language"].tolist())
+        df["polarity"] = [p for p, _ in puntajes]                # Polaridad y subjetividad
+        df["subjectivity"] = [s for _, s in puntajes]
+    df["sentiment"] = label_polarities(df["polarity"], umbral_positivo, umbral_negativo)
 
 # --------------------------------------------------------------------------------
 # Sección: Ranking e Información General
@@ -175,12 +433,12 @@ if "df_info" in st.session_state and not st.session_state["df_info"].empty:
 
     # Para poder agrupar reseñas por lugar, necesitamos acceder a df de reseñas
     df = st.session_state["df"]
-    df["text_clean"] = df["text"].apply(clean_text)         # Limpieza de texto
-    df["sentiment"] = df["text_clean"].apply(analyze_sentiment)  # Análisis de sentimiento
     df["datetime_utc"] = pd.to_datetime(df["datetime_utc"], errors="coerce")  # Conversión a fecha
 
-    # Agrupación por nombre de lugar para obtener estadísticas
-    resumen_sentimiento = df.groupby("location_name").agg(
+    # Agrupación por nombre de lugar para obtener estadísticas.
+    # Las reseñas casi duplicadas no cuentan para no sesgar el % de positivas.
+    df_unicas = df[df["duplicate_of"].isna()] if "duplicate_of" in df.columns else df
+    resumen_sentimiento = df_unicas.groupby("location_name").agg(
         avg_rating=("rating", "mean"),
         pct_positivo=("sentiment", lambda x: (x == "positive").mean() * 100),
         last_review_date=("datetime_utc", "max")
@@ -191,6 +449,9 @@ if "df_info" in st.session_state and not st.session_state["df_info"].empty:
     df_info["last_review_date"] = df_info["location_name"].map(
         resumen_sentimiento.set_index("location_name")["last_review_date"]
     )
+    df_info["pct_positivo"] = df_info["location_name"].map(
+        resumen_sentimiento.set_index("location_name")["pct_positivo"]
+    )
 
     # Se crea la columna de URL para Google Maps con base en el place_id
     df_info["maps_url"] = "https://www.google.com/maps/place/?q=place_id=" + df_info["place_id"]
@@ -202,26 +463,28 @@ if "df_info" in st.session_state and not st.session_state["df_info"].empty:
     colC.metric("Lugares Procesados", len(df_info))
 
     # Creamos un dataframe para el ranking
-    df_ranking = df_info[["location_name", "user_ratings_total", "rating", "formatted_address", "last_review_date", "maps_url"]].copy()
+    df_ranking = df_info[["location_name", "user_ratings_total", "rating", "pct_positivo", "formatted_address", "last_review_date", "maps_url"]].copy()
     df_ranking = df_ranking.rename(columns={
         "location_name": "📍 Lugar",
         "user_ratings_total": "💬 Opiniones Totales",
         "rating": "⭐ Promedio Rating",
+        "pct_positivo": "😊 % Positivas",
         "formatted_address": "📌 Dirección",
         "last_review_date": "🕓 Última Opinión",
         "maps_url": "🔗 Ver en Google Maps"
     }).sort_values("⭐ Promedio Rating", ascending=False).reset_index(drop=True)
 
     # Visualización del ranking en una tabla estilizada
-    st.dataframe(df_ranking.style.format({
-        "⭐ Promedio Rating": "{:.2f}",
-        "💬 Opiniones Totales": "{:.0f}",
-        "🕓 Última Opinión": lambda x: x.strftime("%Y-%m-%d") if pd.notnull(x) else "-"
-    }))
+    with stage("tabla_ranking", perfilar, sesion_perfil):
+        st.dataframe(df_ranking.style.format({
+            "⭐ Promedio Rating": "{:.2f}",
+            "💬 Opiniones Totales": "{:.0f}",
+            "😊 % Positivas": "{:.1f}",
+            "🕓 Última Opinión": lambda x: x.strftime("%Y-%m-%d") if pd.notnull(x) else "-"
+        }))
 
-    # Botón para descargar el CSV con info + ranking
-    csv_info = df_ranking.to_csv(index=False, encoding="utf-8")
-    st.download_button("📥 Descargar CSV (Info + Ranking)", csv_info, "ranking_info.csv", "text/csv", key="download_combined")
+    # Botón para descargar la info + ranking (se genera solo al hacer clic)
+    boton_descarga(df_ranking, "📥 Descargar (Info + Ranking)", "ranking_info", key="download_combined")
 
     # --------------------------------------------------------------------------------
     # Sección de mapa interactivo
@@ -230,30 +493,11 @@ if "df_info" in st.session_state and not st.session_state["df_info"].empty:
     if "lat" in df_info.columns and "lng" in df_info.columns:
         st.markdown("### 🗺️ Mapa Interactivo de Ubicaciones")
         df_map = df_info.rename(columns={"lat": "latitude", "lng": "longitude"})
-        # Se genera una etiqueta combinando nombre y rating
-        df_map["label"] = df_map.apply(lambda row: f"{row['location_name']} ⭐{row['rating']:.1f}", axis=1)
-
-        # Capa de dispersión para las ubicaciones
-        scatter_layer = pdk.Layer(
-            "ScatterplotLayer",
-            data=df_map,
-            get_position='[longitude, latitude]',
-            get_fill_color='[255, 105, 180, 160]',
-            get_radius=300,
-            pickable=True
-        )
-        # Capa de texto para mostrar el nombre + rating
-        text_layer = pdk.Layer(
-            "TextLayer",
-            data=df_map,
-            get_position='[longitude, latitude]',
-            get_text="label",
-            get_size=16,
-            get_color=[0, 0, 0],
-            get_angle=0,
-            get_text_anchor="'middle'",
-            get_alignment_baseline="'bottom'"
-        )
+        # Capas del mapa: puntos individuales o celdas agregadas si hay muchos lugares
+        map_layers, agregado = build_map_layers(df_map)
+        if agregado:
+            st.caption(f"Se agruparon {len(df_map)} lugares en celdas (promedio de rating y cantidad por celda).")
+
         # Vista inicial del mapa (centrada en la media de lat/long de los lugares)
         view_state = pdk.ViewState(
             latitude=df_map["latitude"].mean(),
@@ -262,11 +506,38 @@ if "df_info" in st.session_state and not st.session_state["df_info"].empty:
             pitch=30
         )
         # Se muestra el mapa con ambas capas
-        st.pydeck_chart(pdk.Deck(
-            map_style='mapbox://styles/mapbox/light-v9',
-            initial_view_state=view_state,
-            layers=[scatter_layer, text_layer]
-        ))
+        with stage("mapa", perfilar, sesion_perfil):
+            st.pydeck_chart(pdk.Deck(
+                map_style='mapbox://styles/mapbox/light-v9',
+                initial_view_state=view_state,
+                layers=map_layers
+            ))
+
+# --------------------------------------------------------------------------------
+# Sección: Competidores Similares
+# Lugares cuyos clientes hablan de lo mismo (similitud TF-IDF de sus reseñas), con los
+# términos que comparten y los que distinguen a cada competidor.
+# --------------------------------------------------------------------------------
+if ("df" in st.session_state and "text_clean" in st.session_state["df"].columns
+        and st.session_state["df"]["place_id"].nunique() > 1 and similitud_disponible()):
+    st.markdown("---")
+    st.markdown("## 🤝 Competidores Similares")
+    with stage("similitud", perfilar, sesion_perfil):
+        modelo_similitud = place_similarity(st.session_state["df"])
+    nombres_lugares = dict(zip(modelo_similitud.place_ids, modelo_similitud.names))
+    lugar_base = st.selectbox(
+        "Lugar", modelo_similitud.place_ids, format_func=lambda pid: nombres_lugares[pid], key="similitud_lugar"
+    )
+    similares = modelo_similitud.similar(lugar_base)
+    if similares.empty:
+        st.info("No hay lugares con reseñas parecidas.")
+    else:
+        st.dataframe(similares.drop(columns=["place_id"]).rename(columns={
+            "location_name": "📍 Competidor",
+            "similarity": "🔗 Similitud",
+            "shared_terms": "🤝 Términos en común",
+            "distinctive_terms": "✨ Lo distingue"
+        }).style.format({"🔗 Similitud": "{:.2f}"}))
 
 # --------------------------------------------------------------------------------
 # Sección: Opiniones Recientes
@@ -279,8 +550,6 @@ if "df" in st.session_state and not st.session_state["df"].empty:
     st.markdown("## 💬 Opiniones Recientes (últimas 5 por lugar)")
 
     df = st.session_state["df"]
-    df["text_clean"] = df["text"].apply(clean_text)          # Limpieza de texto
-    df["sentiment"] = df["text_clean"].apply(analyze_sentiment)  # Análisis de sentimiento
     df["datetime_utc"] = pd.to_datetime(df["datetime_utc"], errors="coerce")  # Conversión a fecha
 
     # KPIs principales de la sección
@@ -294,6 +563,8 @@ if "df" in st.session_state and not st.session_state["df"].empty:
     col2.metric("Locaciones Únicas", f"{distinct_locs}")
     col3.metric("Rating Promedio", f"{avg_rating:.2f}" if avg_rating else "-")
     col4.metric("% Reseñas Positivas", f"{(positive_count/total_reviews*100):.1f}%" if total_reviews else "-")
+    if "duplicate_of" in df.columns and df["duplicate_of"].notna().any():
+        st.caption(f"🧬 {df['duplicate_of'].notna().sum()} reseñas casi duplicadas (copiadas o de plantilla) se excluyen del ranking.")
 
     # Conteo de sentimientos para graficar
     sentiment_counts = df["sentiment"].value_counts()
@@ -309,7 +580,21 @@ if "df" in st.session_state and not st.session_state["df"].empty:
     with col_chart2:
         st.markdown("### 🌐 WordCloud de Palabras Más Frecuentes")
         # JuancaM - Llamamos a la función para generar la nube de palabras.
-        generar_wordcloud(df)
+        with stage("wordcloud", perfilar, sesion_perfil):
+            generar_wordcloud(df)
+
+    # Reseñas más negativas según la polaridad guardada, para priorizar su atención
+    st.markdown("### 🚨 Reseñas Más Negativas")
+    mas_negativas = df[df["sentiment"] == "negative"].nsmallest(10, "polarity")
+    if mas_negativas.empty:
+        st.info("No hay reseñas negativas con los umbrales actuales.")
+    else:
+        with stage("tabla_negativas", perfilar, sesion_perfil):
+            st.dataframe(mas_negativas[["location_name", "author_name", "rating", "polarity", "subjectivity", "text_clean"]].style.format({
+                "rating": "{:.1f}",
+                "polarity": "{:.2f}",
+                "subjectivity": "{:.2f}"
+            }))
 
     # Tabla de reseñas con sentimiento
     st.markdown("### 🗂️ Tabla de Reseñas con Sentimiento")
@@ -323,15 +608,179 @@ if "df" in st.session_state and not st.session_state["df"].empty:
         else:
             return "color: gray;"
 
-    # Mostramos algunas columnas relevantes en la tabla
-    st.dataframe(df[["location_name", "author_name", "rating", "datetime_utc", "text_clean", "sentiment"]].style.format({
-        "rating": "{:.1f}",
-        "datetime_utc": lambda x: x.strftime("%Y-%m-%d %H:%M") if pd.notnull(x) else "-"
-    }).map(style_sentiment, subset=["sentiment"]))
+    # Los índices de filtrado se construyen una sola vez por conjunto de reseñas
+    # (se reconstruyen si cambian los umbrales, porque cambian las etiquetas)
+    index_key = (id(df), len(df), umbral_positivo, umbral_negativo)
+    if st.session_state.get("review_index_key") != index_key:
+        with stage("indice_tabla", perfilar, sesion_perfil):
+            st.session_state["review_index"] = build_review_index(df)
+        st.session_state["review_index_key"] = index_key
+    review_index = st.session_state["review_index"]
+
+    # Filtros, orden y tamaño de página
+    f_col1, f_col2, f_col3, f_col4 = st.columns(4)
+    with f_col1:
+        filtro_lugares = st.multiselect("Lugar", sorted(review_index.get("location_name", {})), key="filtro_lugares")
+    with f_col2:
+        filtro_sentimiento = st.multiselect("Sentimiento", ["positive", "neutral", "negative"], key="filtro_sentimiento")
+    with f_col3:
+        filtro_rating = st.slider("Rating", 1, 5, (1, 5), key="filtro_rating")
+    with f_col4:
+        fechas = df["datetime_utc"].dropna()
+        rango_completo = (fechas.min().date(), fechas.max().date()) if not fechas.empty else ()
+        filtro_fechas = st.date_input("Rango de fechas", value=rango_completo, key="filtro_fechas")
+
+    o_col1, o_col2, o_col3, o_col4 = st.columns(4)
+    columnas_orden = {"Fecha": "datetime_utc", "Rating": "rating", "Lugar": "location_name", "Sentimiento": "sentiment"}
+    with o_col1:
+        orden = st.selectbox("Ordenar por", list(columnas_orden), key="orden_tabla")
+    with o_col2:
+        ascendente = st.toggle("Ascendente", value=False, key="orden_ascendente")
+    with o_col3:
+        page_size = st.selectbox("Filas por página", [25, 50, 100, 250], index=1, key="page_size")
+
+    # Rating y fechas solo filtran si el usuario acotó el rango: con el rango completo
+    # se conservan las reseñas sin rating o con fecha inválida
+    positions = filter_reviews(
+        df, review_index,
+        places=filtro_lugares,
+        sentiments=filtro_sentimiento,
+        date_range=tuple(filtro_fechas) if len(filtro_fechas) == 2 and tuple(filtro_fechas) != rango_completo else None,
+        rating_range=filtro_rating if tuple(filtro_rating) != (1, 5) else None
+    )
+    total_pages = max(1, -(-len(positions) // page_size))
+    with o_col4:
+        page = st.number_input(f"Página (de {total_pages})", min_value=1, max_value=total_pages, value=1, key="page_number")
+
+    page_df, _ = paginate(df, positions, sort_by=columnas_orden[orden], ascending=ascendente, page=page, page_size=page_size)
+    st.caption(f"{len(positions)} reseñas coinciden con los filtros")
+
+    # Solo se estiliza la página visible
+    with stage("tabla_resenas", perfilar, sesion_perfil):
+        st.dataframe(page_df[["location_name", "author_name", "rating", "datetime_utc", "text_clean", "sentiment"]].style.format({
+            "rating": "{:.1f}",
+            "datetime_utc": lambda x: x.strftime("%Y-%m-%d %H:%M") if pd.notnull(x) else "-"
+        }).map(style_sentiment, subset=["sentiment"]))
 
-    # Botón de descarga con CSV de todas las reseñas (limpias y con sentimiento)
-    csv_data = df.to_csv(index=False, encoding="utf-8")
-    st.download_button("📥 Descargar CSV (Opiniones)", csv_data, "reviews_with_sentiment.csv", "text/csv", key="download_reviews")
+    # Botón de descarga de todas las reseñas (limpias y con sentimiento)
+    boton_descarga(df, "📥 Descargar (Opiniones)", "reviews_with_sentiment", key="download_reviews")
+
+# --------------------------------------------------------------------------------
+# Sección: Tendencias
+# Se grafica a partir de los agregados diarios precalculados (no de las reseñas).
+# --------------------------------------------------------------------------------
+rollups = cargar_rollups()
+if not rollups.daily.empty:
+    st.markdown("---")
+    st.markdown("## 📈 Tendencias")
+    lugares_rollup = rollups.place_labels()
+    t_col1, t_col2, t_col3 = st.columns([3, 1, 1])
+    with t_col1:
+        lugares_trend = st.multiselect(
+            "Lugares", list(lugares_rollup.index), format_func=lambda pid: lugares_rollup[pid], key="trend_lugares"
+        )
+    with t_col2:
+        periodo = st.selectbox("Periodo", ["Semana", "Día"], key="trend_periodo")
+    with t_col3:
+        metrica = st.selectbox("Métrica", ["Reseñas", "Rating promedio", "% positivas"], key="trend_metrica")
+
+    with stage("tendencias", perfilar, sesion_perfil):
+        df_trend = rollups.trend(lugares_trend or None, freq="W" if periodo == "Semana" else "D")
+    columna_metrica = {"Reseñas": "n_reviews", "Rating promedio": "avg_rating", "% positivas": "pct_positive"}[metrica]
+    if not df_trend.empty:
+        st.line_chart(df_trend.pivot(index="period", columns="location_name", values=columna_metrica))
+        st.markdown("#### Términos más mencionados")
+        st.bar_chart(rollups.top_terms(lugares_trend or None))
+
+# --------------------------------------------------------------------------------
+# Sección: Búsqueda en todas las reseñas recopiladas
+# Usa el índice invertido (no solo las reseñas de la ejecución actual).
+# --------------------------------------------------------------------------------
+indice = cargar_indice()
+if len(indice):
+    st.markdown("---")
+    st.markdown("## 🔎 Buscar en Todas las Reseñas")
+    st.markdown("<small style='color: gray;'>Ejemplos: comida fría · \"servicio lento\" · pizza OR pasta · café -caro</small>", unsafe_allow_html=True)
+    consulta = st.text_input("Buscar", key="busqueda_resenas", label_visibility="collapsed")
+    if consulta.strip():
+        with stage("busqueda", perfilar, sesion_perfil):
+            resultados = indice.search(consulta, limit=500)
+        if len(resultados) == 500:
+            st.caption(f"Se muestran las 500 reseñas más recientes que coinciden, entre {len(indice)} indexadas")
+        else:
+            st.caption(f"{len(resultados)} reseñas encontradas entre {len(indice)} indexadas")
+        if resultados:
+            df_resultados = pd.DataFrame(resultados)
+            st.dataframe(df_resultados[["location_name", "author_name", "rating", "datetime_utc", "text_clean", "sentiment"]])
+
+# --------------------------------------------------------------------------------
+# Sección: Consultas SQL sobre todas las reseñas y lugares guardados
+# Las consultas corren en DuckDB; solo el resultado se carga en pandas.
+# --------------------------------------------------------------------------------
+st.markdown("---")
+with st.expander("🧮 Consultas SQL (reseñas y lugares guardados)"):
+    if not sql_disponible():
+        st.info("Instala el paquete duckdb para habilitar las consultas SQL.")
+    else:
+        motor_sql = cargar_motor_sql()
+        try:
+            motor_sql.refresh()
+        except Exception as e:
+            # Un CSV dañado no debe tumbar la página: se consulta lo que ya estaba cargado
+            st.error(f"No se pudieron cargar los archivos nuevos en la base SQL: {e}")
+        tablas = motor_sql.tables()
+        if tablas:
+            st.caption(" · ".join(f"**{tabla}** ({', '.join(columnas)})" for tabla, columnas in tablas.items()))
+        consulta_sql = st.text_area(
+            "SQL",
+            value="SELECT location_name, count(*) AS reseñas, avg(rating) AS rating\n"
+                  "FROM reviews_latest\nGROUP BY location_name\nORDER BY reseñas DESC",
+            height=120,
+            key="consulta_sql"
+        )
+        # El resultado se guarda en la sesión para que siga visible en las siguientes ejecuciones
+        if st.button("▶️ Ejecutar consulta", key="ejecutar_sql"):
+            inicio = datetime.datetime.now()
+            try:
+                st.session_state["resultado_sql"] = motor_sql.query(consulta_sql)
+                st.session_state["tiempo_sql"] = (datetime.datetime.now() - inicio).total_seconds()
+            except Exception as e:
+                st.session_state.pop("resultado_sql", None)
+                st.error(f"Error en la consulta: {e}")
+        if "resultado_sql" in st.session_state:
+            resultado_sql = st.session_state["resultado_sql"]
+            st.caption(f"{len(resultado_sql)} filas en {st.session_state['tiempo_sql']:.3f} s (se muestran hasta 10 000)")
+            st.dataframe(resultado_sql.head(10000))
+            boton_descarga(resultado_sql, "📥 Descargar resultado", "consulta_sql", key="download_sql")
+
+# --------------------------------------------------------------------------------
+# Sección: Perfil por etapas (solo con el perfilado activo)
+# Estadísticas acumuladas de todas las ejecuciones desde que se activó o reinició.
+# --------------------------------------------------------------------------------
+if perfilar and stage_summary(sesion_perfil):
+    st.markdown("---")
+    st.markdown("## 🩺 Perfil por Etapas")
+    resumen_etapas = pd.DataFrame(stage_summary(sesion_perfil))
+    st.dataframe(resumen_etapas.rename(columns={
+        "stage": "Etapa", "runs": "Ejecuciones", "total_s": "Total (s)", "mean_s": "Promedio (s)"
+    }))
+    etapa = st.selectbox("Funciones más costosas de la etapa", ["(todas)"] + resumen_etapas["stage"].tolist(), key="perfil_etapa")
+    etapa = None if etapa == "(todas)" else etapa
+    funciones = pd.DataFrame(top_functions(etapa, session=sesion_perfil))
+    if not funciones.empty:
+        st.dataframe(funciones)
+
+    p_col1, p_col2, p_col3 = st.columns(3)
+    with p_col1:
+        st.download_button("📥 Descargar .pstats", functools.partial(dump_pstats, etapa, session=sesion_perfil),
+                           "perfil.pstats", "application/octet-stream", key="download_pstats", on_click="ignore")
+    with p_col2:
+        # Formato "collapsed" para flamegraph.pl o speedscope
+        st.download_button("📥 Descargar para flamegraph",
+                           functools.partial(collapsed_stacks, etapa, session=sesion_perfil), "perfil.folded",
+                           "text/plain", key="download_flamegraph", on_click="ignore")
+    with p_col3:
+        st.button("🔄 Reiniciar perfil", on_click=reset_stats, args=(sesion_perfil,))
 
 # --------------------------------------------------------------------------------
 # JuancaM - Sugerencia de commit (trabajo colaborativo en GitHub):
@@ -0,0 +1,63 @@
+"""
+Benchmark: clean_text actual vs. la versión anterior (dos pasadas de regex, solo español/inglés).
+Verifica que ambas den el mismo resultado en textos en español e inglés y compara tiempos.
+
+Uso: python -m benchmarks.bench_clean_text
+"""
+
+import random
+import re
+import timeit
+
+from src.text_processing import clean_text
+
+
+def clean_text_legacy(text):
+    """
+    Implementación anterior de clean_text (referencia para comparar salida y tiempo).
+    """
+    if not text:
+        return ""
+    text = text.replace("\n", " ").replace("\r", " ")
+    text = text.lower()
+    text = re.sub(r"[^a-z0-9áéíóúüñ¡!¿?.,:;'\"()\s-]", "", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+WORDS_ES = ["La", "comida", "estaba", "MUY", "rica", "pero", "el", "servicio", "fue", "lento", "café",
+            "atención", "pingüino", "niño", "¡Excelente!", "¿Volvería?", "sí", "baño", "año", "Ñoño",
+            "1º", "2ª", "3er.", "m²", "km³", "x¹⁰", "½", "¼kg", "Genial…", "℃", "™"]
+WORDS_EN = ["The", "food", "was", "GREAT", "but", "service", "slow", "staff", "friendly", "won't",
+            "come", "back", "(again)", "10/10", "price:", "$15", "#best", "e-mail", "50%", "\"wow\""]
+SEPARATORS = [" ", "  ", "\n", "\r\n", "\t", " - ", ", ", ". "]
+
+
+def make_corpus(n=20000, seed=42):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        words = WORDS_ES if rng.random() < 0.5 else WORDS_EN
+        length = rng.randint(5, 80)
+        corpus.append("".join(rng.choice(words) + rng.choice(SEPARATORS) for _ in range(length)))
+    return corpus
+
+
+def main():
+    corpus = make_corpus()
+    mismatches = [t for t in corpus if clean_text(t) != clean_text_legacy(t)]
+    print(f"Textos: {len(corpus)} | diferencias con la versión anterior: {len(mismatches)}")
+
+    ascii_share = sum(t.isascii() for t in corpus) / len(corpus)
+    print(f"Textos ASCII (camino rápido): {ascii_share:.0%}")
+
+    for name, fn in (("anterior", clean_text_legacy), ("actual", clean_text)):
+        best = min(timeit.repeat(lambda: [fn(t) for t in corpus], number=1, repeat=5))
+        print(f"{name:>9}: {best * 1000:8.1f} ms ({best / len(corpus) * 1e6:.2f} µs/texto)")
+
+    if mismatches:
+        raise SystemExit("La salida difiere de la versión anterior en textos español/inglés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Benchmark: tiempo de render de app.py con datos sintéticos a varias escalas.
+Usa AppTest de Streamlit (sin navegador) con las reseñas ya cargadas en la sesión y la
+capa de descarga bloqueada (ninguna consulta llega a la API). Reporta el tiempo de cada
+sección marcada con profiling.stage(), el tiempo total y la memoria máxima (tracemalloc),
+y termina con error si alguna medición supera su presupuesto.
+
+Uso: python -m benchmarks.bench_render [--scales 10,1000,50000] [--budget wordcloud=2.5] [--budget total=20]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# Presupuestos por defecto en segundos (por escala más grande); "total" es la ejecución completa
+DEFAULT_BUDGETS = {
+    "total": 30.0,
+    "tabla_ranking": 2.0,
+    "similitud": 10.0,
+    "mapa": 1.0,
+    "wordcloud": 10.0,
+    "tabla_negativas": 1.0,
+    "indice_tabla": 2.0,
+    "tabla_resenas": 1.0,
+}
+DEFAULT_MEMORY_BUDGET_MB = 1024
+
+WORDS = ["comida", "servicio", "rico", "lento", "excelente", "frío", "amable", "caro", "limpio", "volveremos",
+         "food", "service", "great", "slow", "friendly", "cold", "expensive", "clean", "tacos", "coffee"]
+
+
+def make_data(n_reviews, seed=0):
+    """
+    Reseñas y lugares sintéticos con las columnas que produce el pipeline.
+    """
+    rng = np.random.default_rng(seed)
+    n_places = max(1, n_reviews // 5)
+    places = [f"place_{i}" for i in range(n_places)]
+    place_idx = rng.integers(0, n_places, n_reviews)
+    lengths = rng.integers(5, 40, n_reviews)
+    words = np.array(WORDS)
+    texts = [" ".join(words[rng.integers(0, len(words), length)]) for length in lengths]
+    polarity = rng.uniform(-1, 1, n_reviews)
+    df = pd.DataFrame({
+        "review_id": [f"r{i}" for i in range(n_reviews)],
+        "place_id": np.array(places)[place_idx],
+        "location_name": np.array([f"Lugar {i}" for i in range(n_places)])[place_idx],
+        "author_name": [f"autor {i}" for i in range(n_reviews)],
+        "rating": rng.integers(1, 6, n_reviews),
+        "datetime_utc": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730 * 86400, n_reviews), unit="s"),
+        "text": texts,
+        "language": "",
+        "text_clean": texts,
+        "detected_language": "es",
+        "polarity": polarity,
+        "subjectivity": rng.uniform(0, 1, n_reviews),
+        "sentiment": np.where(polarity > 0.1, "positive", np.where(polarity < -0.1, "negative", "neutral")),
+        "duplicate_of": None
+    })
+    df_info = pd.DataFrame({
+        "place_id": places,
+        "name": [f"Lugar {i}" for i in range(n_places)],
+        "rating": rng.uniform(1, 5, n_places).round(1),
+        "user_ratings_total": rng.integers(1, 2000, n_places),
+        "formatted_address": "Calle 1, Ciudad",
+        "types": "restaurant",
+        "lat": 19.40 + rng.uniform(0, 0.1, n_places),
+        "lng": -99.20 + rng.uniform(0, 0.1, n_places)
+    })
+    return df, df_info
+
+
+def _block_api():
+    # Ninguna consulta debe llegar a la API durante el benchmark
+    import src.reviews_fetcher as reviews_fetcher
+
+    def blocked(*args, **kwargs):
+        raise RuntimeError("La API está bloqueada durante el benchmark")
+    reviews_fetcher.requests.get = blocked
+
+
+def render(df, df_info, trace_memory=False):
+    """
+    Ejecuta app.py una vez con los datos en la sesión.
+    Retorna:
+      (segundos totales, {sección: segundos}, memoria máxima en MB o None)
+    """
+    from streamlit.testing.v1 import AppTest
+    from src import profiling
+
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    at.session_state["df"] = df.copy()
+    at.session_state["df_info"] = df_info.copy()
+    # Las estadísticas de cada etapa se acumulan bajo la sesión de perfilado de la app
+    at.session_state["perfil_sesion"] = "bench"
+    profiling.reset_stats("bench")
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    peak_mb = None
+    if trace_memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    if at.exception:
+        raise RuntimeError(f"app.py lanzó una excepción: {at.exception[0].value}")
+    sections = {row["stage"]: row["total_s"] for row in profiling.stage_summary("bench")}
+    return elapsed, sections, peak_mb
+
+
+def parse_budgets(values):
+    budgets = dict(DEFAULT_BUDGETS)
+    for value in values or []:
+        name, _, seconds = value.partition("=")
+        budgets[name.strip()] = float(seconds)
+    return budgets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de render de app.py")
+    parser.add_argument("--scales", default="10,1000,50000", help="Cantidades de reseñas separadas por coma")
+    parser.add_argument("--budget", action="append", help="Presupuesto sección=segundos (se puede repetir)")
+    parser.add_argument("--memory-budget-mb", type=float, default=DEFAULT_MEMORY_BUDGET_MB)
+    args = parser.parse_args(argv)
+    budgets = parse_budgets(args.budget)
+
+    # Los datos guardados (índice, tendencias, etc.) se leen de un directorio vacío
+    os.chdir(tempfile.mkdtemp(prefix="bench_render_"))
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    from src import profiling
+    profiling.set_enabled(True, timing_only=True)
+    _block_api()
+
+    failures = []
+    scales = [int(scale) for scale in args.scales.split(",")]
+    for n_reviews in scales:
+        df, df_info = make_data(n_reviews)
+        render(df, df_info)  # Calentamiento: importaciones y cachés de Streamlit
+        elapsed, sections, _ = render(df, df_info)
+        _, _, peak_mb = render(df, df_info, trace_memory=True)
+
+        print(f"\n{n_reviews} reseñas / {len(df_info)} lugares")
+        print(f"  {'total':<18}{elapsed * 1000:10.1f} ms")
+        for name, seconds in sorted(sections.items(), key=lambda item: -item[1]):
+            print(f"  {name:<18}{seconds * 1000:10.1f} ms")
+        print(f"  {'memoria máxima':<18}{peak_mb:10.1f} MB")
+
+        # Los presupuestos se aplican a la escala más grande
+        if n_reviews == max(scales):
+            measured = dict(sections, total=elapsed)
+            for name, budget in budgets.items():
+                if name in measured and measured[name] > budget:
+                    failures.append(f"{name}: {measured[name]:.2f} s > {budget:.2f} s ({n_reviews} reseñas)")
+            if peak_mb > args.memory_budget_mb:
+                failures.append(f"memoria: {peak_mb:.0f} MB > {args.memory_budget_mb:.0f} MB ({n_reviews} reseñas)")
+
+    if failures:
+        print("\nPresupuestos excedidos:")
+        for failure in failures:
+            print(f"  - {failure}")
+        raise SystemExit(1)
+    print("\nTodas las mediciones dentro del presupuesto.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,15 @@
 import os
+import sys
 import requests
 import csv
 import time
 from dotenv import load_dotenv
 from datetime import datetime
 
+# La bitácora de trabajos vive en src/; este script está en una subcarpeta de src/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from job_journal import JobJournal
+
 ################################################################################
 # 1) Carga de variables de entorno
 ################################################################################
@@ -51,21 +56,25 @@ def get_place_id_from_name(business_name):
 ################################################################################
 # 3) Descarga reseñas dada un place_id (API Place Details)
 ################################################################################
-def fetch_reviews(place_id):
+def fetch_reviews(place_id, page_token=None, on_page=None):
     """
-    Retorna (all_reviews_list, location_name).
+    Retorna (all_reviews_list, location_name, status).
       - all_reviews_list es una lista de dicts con:
           place_id, location_name, author_name, rating, datetime_utc, text
       - location_name es el nombre oficial del lugar (devuelto por la API).
+      - status es "OK" si se descargaron todas las páginas; si no, el status de la API
+        que interrumpió la descarga o "ERROR" si falló la conexión.
     Maneja paginación (next_page_token).
+      - page_token permite continuar desde una página guardada en la bitácora.
+      - on_page(reviews_de_la_pagina, next_page_token, location_name) se llama tras cada página.
     """
     if not place_id:
         print("[ERROR] place_id inválido, no se pueden descargar reseñas.")
-        return [], None
+        return [], None, "INVALID_REQUEST"
 
     all_reviews = []
     url = "https://maps.googleapis.com/maps/api/place/details/json"
-    next_page_token = None
+    next_page_token = page_token
 
     # Guardaremos el nombre del lugar cuando se obtenga
     location_name = None
@@ -85,6 +94,7 @@ def fetch_reviews(place_id):
             data = response.json()
         except Exception as e:
             print(f"[ERROR] Error al conectar con la API: {e}")
+            status = "ERROR"
             break
 
         status = data.get("status")
@@ -98,6 +108,7 @@ def fetch_reviews(place_id):
             location_name = result.get("name", "Unknown")
 
         reviews = result.get("reviews", [])
+        page_reviews = []
         for r in reviews:
             # 'time' (UNIX) está presente, pero no lo guardaremos en el CSV final.
             unix_ts = r.get("time", None)
@@ -115,9 +126,12 @@ def fetch_reviews(place_id):
                 "datetime_utc": dt_utc,   # fecha/hora legible
                 "text": r.get("text")    # reseña
             }
-            all_reviews.append(item)
+            page_reviews.append(item)
+        all_reviews.extend(page_reviews)
 
         next_page_token = data.get("next_page_token")
+        if on_page:
+            on_page(page_reviews, next_page_token, location_name)
         if not next_page_token:
             # No hay más páginas
             break
@@ -125,7 +139,7 @@ def fetch_reviews(place_id):
         print("[INFO] Más reseñas encontradas (paginación). Esperamos 2s...")
         time.sleep(2)
 
-    return all_reviews, location_name
+    return all_reviews, location_name, status
 
 ################################################################################
 # 4) Guardar TODAS las reseñas en un solo CSV
@@ -212,24 +226,58 @@ def main():
     # Lista global para todas las reseñas
     all_reviews_global = []
 
+    # Bitácora: cada lugar (y cada página) descargado se anota en disco. Si el proceso
+    # se interrumpe, al volver a ejecutarlo se omiten los lugares ya completados.
+    csv_filename = "reviews_combined.csv"
+    journal = JobJournal(csv_filename + ".journal.jsonl")
+    if journal.completed_count():
+        print(f"[INFO] Reanudando: {journal.completed_count()} lugar(es) ya completados en una ejecución anterior.")
+
     print(f"\n[INFO] Vamos a procesar {len(lugares)} lugar(es).")
+    # Lugares que no se descargaron completos: quedan pendientes en la bitácora
+    fallidos = []
 
     for idx, (tipo, valor) in enumerate(lugares, start=1):
+        key = f"{tipo}:{valor}"
+        previo = journal.completed(key)
+        if previo is not None:
+            print(f"\n[{idx}] '{valor}' ya se había descargado. Se reutilizan {len(previo[0])} reseñas.")
+            all_reviews_global.extend(previo[0])
+            continue
+
         if tipo == 'id':
             place_id = valor
             print(f"\n[{idx}] Descargando reseñas para place_id='{place_id}'")
-            reviews_list, loc_name = fetch_reviews(place_id)
         else:
             # tipo='name'
             business_name = valor
             print(f"\n[{idx}] Buscando place_id para el nombre='{business_name}'")
-            p_id, found_name, address = get_place_id_from_name(business_name)
-            if not p_id:
+            place_id, found_name, address = get_place_id_from_name(business_name)
+            if not place_id:
                 print("[ERROR] No se pudo obtener place_id. Omitimos este negocio.")
                 continue
-            print(f"[INFO] place_id={p_id} para '{found_name}' (Dir: {address})")
-            reviews_list, loc_name = fetch_reviews(p_id)
-        
+            print(f"[INFO] place_id={place_id} para '{found_name}' (Dir: {address})")
+
+        # Si hubo una descarga parcial, se continúa desde la última página guardada
+        previas, token, loc_previo = journal.partial(key) or ([], None, None)
+        if previas and not token:
+            reviews_list, status = previas, "OK"
+        else:
+            on_page = lambda page, next_token, loc: journal.record_page(key, page, next_token, loc)
+            reviews_list, loc_name, status = fetch_reviews(place_id, page_token=token, on_page=on_page)
+            if token and status in ("INVALID_REQUEST", "NOT_FOUND"):
+                # El token guardado venció: se descarta el avance parcial y se empieza de nuevo
+                print("[INFO] El token de página guardado venció; se descarga de nuevo desde la primera página.")
+                journal.reset_partial(key)
+                previas = []
+                reviews_list, loc_name, status = fetch_reviews(place_id, on_page=on_page)
+            reviews_list = previas + reviews_list
+        if status == "OK":
+            journal.record_done(key, reviews_list, {})
+        else:
+            print(f"[WARNING] Descarga incompleta (status={status}); se reintentará en la siguiente ejecución.")
+            fallidos.append((valor, status))
+
         print(f"[INFO] Se obtuvieron {len(reviews_list)} reseñas.")
         # Agregamos todas las reseñas a la lista global
         all_reviews_global.extend(reviews_list)
@@ -239,8 +287,15 @@ def main():
         return
 
     # Guardar en un SOLO CSV
-    csv_filename = "reviews_combined.csv"
     save_all_reviews_to_csv(all_reviews_global, csv_filename)
+    if fallidos:
+        # La bitácora se conserva para reintentar solo los lugares que fallaron
+        print(f"\n[WARNING] {len(fallidos)} lugar(es) no se descargaron completos:")
+        for valor, status in fallidos:
+            print(f"  - {valor}: status={status}")
+        print("[INFO] Vuelve a ejecutar el script con los mismos lugares para reintentarlos.")
+    else:
+        journal.finish()
 
     print("\n[INFO] ¡Proceso finalizado! Se combinó todo en reviews_combined.csv.")
 
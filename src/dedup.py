@@ -0,0 +1,233 @@
+"""
+Módulo: dedup.py
+Detección de reseñas casi duplicadas (copiadas o de plantilla) con MinHash y LSH.
+Las firmas se calculan por lotes con numpy y se agrupan en cubetas por bandas, de modo
+que solo se comparan reseñas que caen en la misma cubeta (sin comparar todos contra todos).
+Las firmas se guardan en disco para revisar reseñas nuevas contra todo el histórico, en
+segmentos de solo-agregar que se fusionan por tamaño (igual que el índice de text_index.py).
+"""
+
+import glob
+import os
+import threading
+import zlib
+
+import numpy as np
+
+from src.text_index import tokenize
+
+NUM_PERM = 128
+BANDS = 32  # 32 bandas de 4 filas: umbral aproximado de similitud ~0.42
+SHINGLE_SIZE = 3
+# Textos con menos shingles (reseñas cortas como "excelente" o "muy buen lugar") no se marcan:
+# las frases cortas y comunes se repiten sin ser copias
+MIN_SHINGLES = 4
+SIMILARITY_THRESHOLD = 0.8
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(text, k=SHINGLE_SIZE):
+    """
+    Conjunto de k-gramas de palabras del texto, como enteros de 32 bits (crc32).
+    Textos con menos de k palabras no tienen shingles.
+    """
+    tokens = tokenize(text)
+    grams = {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+class MinHashIndex:
+    """
+    Índice LSH de firmas MinHash.
+      - signatures: matriz (n, NUM_PERM) de uint32
+      - ids: review_id de cada fila
+      - buckets: {(banda, hash de la banda): [filas]}
+    Si se indica 'path' (directorio), el índice se carga de sus segmentos (.npz) y save()
+    agrega uno nuevo solo con las firmas agregadas desde el anterior. Es seguro usarlo desde varios hilos (p. ej. varias sesiones de Streamlit).
+    """
+
+    def __init__(self, path=None, num_perm=NUM_PERM, bands=BANDS, seed=1, min_shingles=MIN_SHINGLES):
+        self.path = path
+        self.num_perm = num_perm
+        self.min_shingles = min_shingles
+        self._lock = threading.Lock()
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        rng = np.random.default_rng(seed)
+        # Coeficientes < 2^31 para que a*x + b no desborde uint64 con shingles de 32 bits
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+        self.ids = []
+        # Buffer con capacidad extra para agregar firmas sin copiar la matriz cada vez
+        self._buffer = np.zeros((1024, num_perm), dtype=np.uint32)
+        self.buckets = {}
+        self._id_rows = {}
+        # Filas ya guardadas en segmentos; las siguientes se escriben en el próximo save()
+        self._saved_rows = 0
+        if path:
+            for _, _, segment_path in self._segments():
+                data = np.load(segment_path, allow_pickle=False)
+                ids = [str(review_id) for review_id in data["ids"]]
+                # Una fusión interrumpida puede dejar las mismas firmas en dos segmentos
+                keep = [i for i, review_id in enumerate(ids) if review_id not in self._id_rows]
+                if keep:
+                    self._append([ids[i] for i in keep], data["signatures"][keep])
+            self._saved_rows = len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def signatures(self):
+        return self._buffer[:len(self.ids)]
+
+    def signatures_for(self, texts):
+        """
+        Calcula las firmas MinHash de varios textos en una sola operación vectorizada.
+        Retorna:
+          Matriz (len(texts), num_perm) de uint32. Los textos con menos de min_shingles
+          shingles quedan con el valor máximo y no se comparan.
+        """
+        result = np.full((len(texts), self.num_perm), _MAX_HASH, dtype=np.uint64)
+        per_text = [shingles(text) for text in texts]
+        counts = np.array([len(values) for values in per_text], dtype=np.int64)
+        non_empty = np.flatnonzero(counts >= max(self.min_shingles, 1))
+        if len(non_empty):
+            values = np.concatenate([per_text[i] for i in non_empty])
+            # Permutaciones universales (a*x + b) mod p aplicadas a todos los shingles a la vez
+            hashed = (np.outer(values, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+            starts = np.concatenate([[0], np.cumsum(counts[non_empty])[:-1]])
+            result[non_empty] = np.minimum.reduceat(hashed, starts, axis=0)
+        return result.astype(np.uint32)
+
+    def _band_keys(self, signatures):
+        # Cada banda se resume en un hash de sus filas
+        bands = signatures.reshape(len(signatures), self.bands, self.rows_per_band)
+        return [[hash(band.tobytes()) for band in sig_bands] for sig_bands in bands]
+
+    def _append(self, ids, signatures, band_keys=None):
+        start = len(self.ids)
+        needed = start + len(ids)
+        if needed > len(self._buffer):
+            grown = np.zeros((max(needed, 2 * len(self._buffer)), self.num_perm), dtype=np.uint32)
+            grown[:start] = self._buffer[:start]
+            self._buffer = grown
+        self._buffer[start:needed] = signatures
+        self.ids.extend(ids)
+        for offset, keys in enumerate(band_keys or self._band_keys(signatures)):
+            row = start + offset
+            self._id_rows[ids[offset]] = row
+            for band, key in enumerate(keys):
+                self.buckets.setdefault((band, key), []).append(row)
+
+    def check_and_add(self, review_ids, texts, threshold=SIMILARITY_THRESHOLD):
+        """
+        Revisa un lote de reseñas contra el índice (y entre sí) y las agrega.
+        Las reseñas ya indexadas (mismo review_id) se revisan pero no se vuelven a agregar.
+        Las reseñas cortas (menos de min_shingles shingles) nunca se marcan ni se agregan.
+        Parámetros:
+          review_ids (list): Identificadores de las reseñas.
+          texts (list): Textos limpios (text_clean).
+          threshold (float): Similitud Jaccard estimada a partir de la cual se marca duplicado.
+        Retorna:
+          Lista con el review_id original del que cada reseña es casi duplicado, o None.
+        """
+        with self._lock:
+            return self._check_and_add(review_ids, texts, threshold)
+
+    def _check_and_add(self, review_ids, texts, threshold):
+        duplicate_of = [None] * len(review_ids)
+        new_rows = [i for i, review_id in enumerate(review_ids) if review_id not in self._id_rows]
+        signatures = self.signatures_for([texts[i] for i in new_rows])
+        band_keys = self._band_keys(signatures)
+
+        for signature, keys, i in zip(signatures, band_keys, new_rows):
+            if (signature == np.uint32(_MAX_HASH)).all():
+                continue
+            candidates = set()
+            for band, key in enumerate(keys):
+                candidates.update(self.buckets.get((band, key), ()))
+            if candidates:
+                rows = np.fromiter(candidates, dtype=np.int64)
+                similarity = (self.signatures[rows] == signature).mean(axis=1)
+                best = int(np.argmax(similarity))
+                if similarity[best] >= threshold:
+                    duplicate_of[i] = self.ids[rows[best]]
+            # Se agrega de inmediato para detectar duplicados dentro del mismo lote
+            self._append([review_ids[i]], signature[np.newaxis, :], [keys])
+
+        # Reseñas que ya estaban indexadas: se busca una reseña anterior parecida
+        new_set = set(new_rows)
+        for i, review_id in enumerate(review_ids):
+            if i not in new_set and len(shingles(texts[i])) >= self.min_shingles:
+                duplicate_of[i] = self._earliest_similar(self._id_rows[review_id], threshold)
+        return duplicate_of
+
+    def _earliest_similar(self, row, threshold):
+        candidates = set()
+        for band, key in enumerate(self._band_keys(self.signatures[row:row + 1])[0]):
+            candidates.update(r for r in self.buckets.get((band, key), ()) if r < row)
+        if not candidates:
+            return None
+        rows = np.array(sorted(candidates), dtype=np.int64)
+        similarity = (self.signatures[rows] == self.signatures[row]).mean(axis=1)
+        matches = rows[similarity >= threshold]
+        return self.ids[matches[0]] if len(matches) else None
+
+    def _segment_path(self, seq, n_rows):
+        return os.path.join(self.path, f"{seq:08d}-{n_rows}.npz")
+
+    def _segments(self):
+        """
+        Segmentos en disco: lista de (secuencia, firmas, ruta) en orden de escritura.
+        """
+        segments = []
+        for segment_path in glob.glob(os.path.join(self.path, "*.npz")):
+            seq, _, n_rows = os.path.basename(segment_path)[:-len(".npz")].partition("-")
+            if seq.isdigit() and n_rows.isdigit():
+                segments.append((int(seq), int(n_rows), segment_path))
+        return sorted(segments)
+
+    @staticmethod
+    def _write_segment(segment_path, ids, signatures):
+        # Escritura atómica mediante un archivo temporal propio de este hilo
+        tmp_path = f"{segment_path}.{os.getpid()}-{threading.get_ident()}.tmp.npz"
+        np.savez_compressed(tmp_path, ids=np.array(ids, dtype=str), signatures=signatures)
+        os.replace(tmp_path, segment_path)
+
+    def save(self):
+        """
+        Guarda en un segmento nuevo las firmas agregadas desde el último save() y fusiona
+        los segmentos pequeños. Las cubetas se reconstruyen al cargar.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            if self._saved_rows == len(self.ids):
+                return
+            os.makedirs(self.path, exist_ok=True)
+            segments = self._segments()
+            seq = segments[-1][0] + 1 if segments else 0
+            start, end = self._saved_rows, len(self.ids)
+            self._write_segment(self._segment_path(seq, end - start), self.ids[start:end], self._buffer[start:end])
+            self._saved_rows = end
+            self._compact()
+
+    def _compact(self):
+        # Debe llamarse con _lock tomado. Fusiona el último segmento con el anterior mientras
+        # el último tenga al menos tantas firmas; el orden de las filas se conserva.
+        segments = self._segments()
+        while len(segments) >= 2 and segments[-1][1] >= segments[-2][1]:
+            (_, _, older_path), (seq, _, newer_path) = segments[-2], segments[-1]
+            ids, signatures = [], []
+            for segment_path in (older_path, newer_path):
+                data = np.load(segment_path, allow_pickle=False)
+                ids.extend(str(review_id) for review_id in data["ids"])
+                signatures.append(data["signatures"])
+            merged_path = self._segment_path(seq, len(ids))
+            if merged_path != newer_path:
+                self._write_segment(merged_path, ids, np.concatenate(signatures))
+                os.remove(newer_path)
+            os.remove(older_path)
+            segments = self._segments()
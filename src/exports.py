@@ -0,0 +1,112 @@
+"""
+Módulo: exports.py
+Generación de archivos de descarga (CSV/Parquet) por bloques, con compresión opcional
+y caché por hash del conjunto de datos para no volver a serializar lo mismo.
+"""
+
+import gzip
+import hashlib
+import importlib.util
+import io
+import pickle
+from collections import OrderedDict
+
+import pandas as pd
+
+# Cantidad máxima de archivos generados que se conservan en memoria
+MAX_CACHED_EXPORTS = 8
+
+_export_cache = OrderedDict()
+
+
+def dataset_hash(df):
+    """
+    Calcula un hash estable del contenido del DataFrame (valores y nombres de columnas).
+    Las columnas con celdas no hasheables (listas, dicts) se hashean serializadas.
+    """
+    hasher = hashlib.sha1()
+    hasher.update("|".join(map(str, df.columns)).encode("utf-8"))
+    try:
+        hasher.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    except TypeError:
+        for _, column in df.items():
+            try:
+                hasher.update(pd.util.hash_pandas_object(column, index=False).to_numpy().tobytes())
+            except TypeError:
+                hasher.update(pickle.dumps(column.tolist(), protocol=pickle.HIGHEST_PROTOCOL))
+    return hasher.hexdigest()
+
+
+def available_formats():
+    """
+    Formatos de exportación disponibles: Parquet solo si está instalado pyarrow o fastparquet.
+    """
+    formats = ["csv"]
+    if any(importlib.util.find_spec(engine) for engine in ("pyarrow", "fastparquet")):
+        formats.append("parquet")
+    return formats
+
+
+def iter_csv_chunks(df, chunk_rows=10000):
+    """
+    Genera el CSV del DataFrame por bloques de 'chunk_rows' filas.
+    El encabezado solo se incluye en el primer bloque.
+    """
+    if df.empty:
+        yield df.to_csv(index=False)
+        return
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=(start == 0))
+
+
+def _write_export(df, fmt, out, chunk_rows):
+    if fmt == "csv":
+        for chunk in iter_csv_chunks(df, chunk_rows):
+            out.write(chunk.encode("utf-8"))
+    elif fmt == "parquet":
+        # Parquet requiere pyarrow (o fastparquet); se escribe de una vez porque es columnar
+        df.to_parquet(out, index=False)
+    else:
+        raise ValueError(f"Formato de exportación no soportado: {fmt}")
+
+
+def build_export(df, fmt="csv", compress=False, chunk_rows=10000):
+    """
+    Serializa el DataFrame en el formato indicado y retorna los bytes del archivo.
+    El resultado se guarda en caché por (hash del dataset, formato, compresión).
+    Parámetros:
+      df (DataFrame): Datos a exportar.
+      fmt (str): "csv" o "parquet".
+      compress (bool): Si es True, el archivo se comprime con gzip.
+      chunk_rows (int): Filas por bloque al escribir CSV.
+    Retorna:
+      bytes
+    """
+    key = (dataset_hash(df), fmt, compress)
+    if key in _export_cache:
+        _export_cache.move_to_end(key)
+        return _export_cache[key]
+
+    buffer = io.BytesIO()
+    if compress:
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as gz:
+            _write_export(df, fmt, gz, chunk_rows)
+    else:
+        _write_export(df, fmt, buffer, chunk_rows)
+    data = buffer.getvalue()
+
+    _export_cache[key] = data
+    while len(_export_cache) > MAX_CACHED_EXPORTS:
+        _export_cache.popitem(last=False)
+    return data
+
+
+def export_file_name(base_name, fmt="csv", compress=False):
+    """
+    Retorna (nombre_de_archivo, mime) para una exportación.
+    """
+    mime = "text/csv" if fmt == "csv" else "application/vnd.apache.parquet"
+    file_name = f"{base_name}.{fmt}"
+    if compress:
+        return file_name + ".gz", "application/gzip"
+    return file_name, mime
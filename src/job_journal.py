@@ -0,0 +1,119 @@
+"""
+Módulo: job_journal.py
+Bitácora (journal) de trabajos de descarga con varios lugares. Cada lugar completado y
+cada página de reseñas descargada se anotan en disco, de modo que si el proceso se
+interrumpe, al volver a ejecutar el mismo trabajo se retoma donde se quedó.
+
+No depende de otros módulos del proyecto para poder usarse también desde los scripts.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+
+def job_id(items, *params):
+    """
+    Identificador de un trabajo a partir de sus lugares de entrada y parámetros (idioma, etc.).
+    El mismo conjunto de lugares y parámetros produce siempre el mismo id.
+    """
+    raw = json.dumps([sorted(items), [str(p) for p in params]], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class JobJournal:
+    """
+    Bitácora en formato JSON Lines (una línea por evento, solo se agregan líneas).
+    Eventos:
+      {"type": "page", "key": ..., "reviews": [...], "next_page_token": ..., "location_name": ...}
+      {"type": "done", "key": ..., "reviews": [...], "general": {...}}
+      {"type": "reset", "key": ...}   Descarta el avance parcial (p. ej. token de página vencido)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done = {}
+        self._partial = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Última línea incompleta si el proceso murió mientras escribía
+                        continue
+                    self._apply(event)
+
+    def _apply(self, event):
+        key = event["key"]
+        if event["type"] == "done":
+            self._done[key] = event
+            self._partial.pop(key, None)
+        elif event["type"] == "page":
+            state = self._partial.setdefault(key, {"reviews": [], "next_page_token": None, "location_name": None})
+            state["reviews"].extend(event["reviews"])
+            state["next_page_token"] = event["next_page_token"]
+            state["location_name"] = event.get("location_name") or state["location_name"]
+        elif event["type"] == "reset":
+            self._partial.pop(key, None)
+
+    def _append(self, event):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._apply(event)
+
+    def completed(self, key):
+        """
+        Retorna (reviews, general) si el lugar ya se completó, o None.
+        """
+        event = self._done.get(key)
+        if event is None:
+            return None
+        return event["reviews"], event["general"]
+
+    def completed_count(self):
+        return len(self._done)
+
+    def partial(self, key):
+        """
+        Retorna (reviews, next_page_token, location_name) descargados hasta ahora
+        para un lugar incompleto, o None si no hay avance parcial.
+        """
+        state = self._partial.get(key)
+        if state is None:
+            return None
+        return list(state["reviews"]), state["next_page_token"], state["location_name"]
+
+    def record_page(self, key, reviews, next_page_token, location_name=None):
+        """
+        Anota una página de reseñas descargada y el token para pedir la siguiente.
+        """
+        self._append({"type": "page", "key": key, "reviews": reviews,
+                      "next_page_token": next_page_token, "location_name": location_name})
+
+    def reset_partial(self, key):
+        """
+        Descarta las páginas anotadas de un lugar incompleto para volver a descargarlo desde
+        la primera página (los next_page_token de la API vencen al poco tiempo).
+        """
+        self._append({"type": "reset", "key": key})
+
+    def record_done(self, key, reviews, general):
+        """
+        Anota un lugar como completado con todas sus reseñas e información general.
+        """
+        self._append({"type": "done", "key": key, "reviews": reviews, "general": general})
+
+    def finish(self):
+        """
+        Elimina la bitácora cuando el trabajo terminó y sus resultados ya se guardaron.
+        """
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
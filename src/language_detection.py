@@ -0,0 +1,102 @@
+"""
+Módulo: language_detection.py
+Identificación de idioma por lotes con un modelo de n-gramas de caracteres.
+Los perfiles de cada idioma se construyen al importar el módulo a partir de textos de
+ejemplo; la detección de un lote completo se resuelve con operaciones vectorizadas de numpy.
+"""
+
+from collections import Counter
+
+import numpy as np
+
+NGRAM_SIZE = 3
+# Con menos n-gramas conocidos que esto no hay evidencia suficiente y se retorna ""
+MIN_NGRAMS = 4
+
+# Textos de ejemplo por idioma (vocabulario típico de reseñas)
+TRAINING_TEXTS = {
+    "es": (
+        "la comida estaba muy rica y el servicio fue excelente, los meseros muy amables. "
+        "el lugar es bonito pero un poco caro para lo que ofrecen. no me gustó la atención, "
+        "tardaron mucho en traer la cuenta y la sopa llegó fría. volveremos con la familia, "
+        "recomiendo los tacos y el café de olla. el baño estaba sucio y no había estacionamiento. "
+        "precios accesibles, buena música y ambiente agradable para ir con amigos. "
+        "pésimo servicio, nunca más regreso. la pizza estaba quemada y las bebidas calientes. "
+        "excelente atención del personal, todo muy limpio y ordenado, lo recomiendo ampliamente. "
+        "que rico desayuno, los chilaquiles son los mejores de la ciudad. hay que esperar mesa "
+        "los fines de semana pero vale la pena. el precio es justo y las porciones son grandes."
+    ),
+    "en": (
+        "the food was delicious and the service was excellent, the waiters were very friendly. "
+        "the place is nice but a bit expensive for what they offer. i did not like the staff, "
+        "it took forever to get the check and the soup was cold. we will come back with the family, "
+        "i recommend the tacos and the coffee. the bathroom was dirty and there was no parking. "
+        "affordable prices, good music and a nice atmosphere to go with friends. "
+        "terrible service, never coming back. the pizza was burnt and the drinks were warm. "
+        "great customer service, everything was very clean and tidy, highly recommended. "
+        "what a great breakfast, best pancakes in town. you have to wait for a table "
+        "on weekends but it is worth it. the price is fair and the portions are huge."
+    ),
+}
+
+
+def _ngrams(text, n=NGRAM_SIZE):
+    padded = f" {text.lower()} "
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+def _build_model(training_texts):
+    counts = {lang: Counter(_ngrams(text)) for lang, text in training_texts.items()}
+    vocab = sorted(set().union(*counts.values()))
+    vocab_index = {gram: i for i, gram in enumerate(vocab)}
+    languages = list(training_texts)
+    # Log-probabilidades con suavizado de Laplace (idiomas x n-gramas)
+    matrix = np.ones((len(languages), len(vocab)))
+    for row, lang in enumerate(languages):
+        for gram, count in counts[lang].items():
+            matrix[row, vocab_index[gram]] += count
+    log_probs = np.log(matrix / matrix.sum(axis=1, keepdims=True))
+    return languages, vocab_index, log_probs
+
+
+LANGUAGES, _VOCAB_INDEX, _LOG_PROBS = _build_model(TRAINING_TEXTS)
+
+
+def detect_languages(texts):
+    """
+    Detecta el idioma de varios textos a la vez.
+    Parámetros:
+      texts (list): Textos (idealmente ya limpios).
+    Retorna:
+      Lista de códigos de idioma ("es", "en", ...) o "" si no hay evidencia suficiente.
+    """
+    if not texts:
+        return []
+    rows, cols = [], []
+    for row, text in enumerate(texts):
+        for gram in _ngrams(text or ""):
+            col = _VOCAB_INDEX.get(gram)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+
+    # Sin matriz densa textos x vocabulario: el puntaje de cada idioma es la suma, por texto,
+    # de las log-probabilidades de sus n-gramas (np.bincount agrupa por fila)
+    rows = np.asarray(rows, dtype=np.intp)
+    cols = np.asarray(cols, dtype=np.intp)
+    scores = np.column_stack([
+        np.bincount(rows, weights=lang_log_probs[cols], minlength=len(texts)) for lang_log_probs in _LOG_PROBS
+    ])
+    best = scores.argmax(axis=1)
+    known = np.bincount(rows, minlength=len(texts))
+    return [LANGUAGES[b] if n >= MIN_NGRAMS else "" for b, n in zip(best, known)]
+
+
+def group_by_language(languages):
+    """
+    Agrupa posiciones por idioma: {idioma: [posiciones]}.
+    """
+    groups = {}
+    for position, lang in enumerate(languages):
+        groups.setdefault(lang, []).append(position)
+    return groups
@@ -0,0 +1,100 @@
+"""
+Módulo: map_layers.py
+Construcción de las capas de pydeck para el mapa de ubicaciones. Con muchos lugares,
+los puntos se agregan en una cuadrícula del lado del servidor para acotar el tamaño
+de los datos que se envían al navegador.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+
+# A partir de cuántos lugares se agrupan los puntos en celdas
+MAP_CLUSTER_THRESHOLD = int(os.getenv("MAP_CLUSTER_THRESHOLD", "500"))
+# Máximo aproximado de celdas que se envían al mapa cuando se agrupa
+MAP_MAX_CELLS = int(os.getenv("MAP_MAX_CELLS", "400"))
+
+
+def build_labels(df_map):
+    """
+    Construye la etiqueta "nombre ⭐rating" de forma vectorizada.
+    """
+    return df_map["location_name"].astype(str) + " ⭐" + df_map["rating"].round(1).astype(str)
+
+
+def aggregate_grid(df_map, max_cells=MAP_MAX_CELLS):
+    """
+    Agrupa los lugares en una cuadrícula de lat/lng.
+    El tamaño de celda se elige para que la cantidad de celdas no pase de 'max_cells'.
+    Parámetros:
+      df_map (DataFrame): Lugares con columnas latitude, longitude, rating.
+      max_cells (int): Cantidad máxima aproximada de celdas.
+    Retorna:
+      DataFrame con una fila por celda: latitude, longitude (centroide), avg_rating,
+      count y label.
+    """
+    points = df_map.dropna(subset=["latitude", "longitude"])
+    lat = points["latitude"].to_numpy()
+    lng = points["longitude"].to_numpy()
+    span = max(np.ptp(lat) if len(lat) else 0.0, np.ptp(lng) if len(lng) else 0.0, 1e-6)
+    cell_size = span / max(1.0, np.sqrt(max_cells))
+
+    cells = pd.DataFrame({
+        "cell_lat": np.floor(lat / cell_size).astype(np.int64),
+        "cell_lng": np.floor(lng / cell_size).astype(np.int64),
+        "latitude": lat,
+        "longitude": lng,
+        "rating": points["rating"].to_numpy(dtype=float),
+    })
+    grid = cells.groupby(["cell_lat", "cell_lng"], sort=False).agg(
+        latitude=("latitude", "mean"),
+        longitude=("longitude", "mean"),
+        avg_rating=("rating", "mean"),
+        count=("rating", "size"),
+    ).reset_index(drop=True)
+    grid["label"] = grid["count"].astype(str) + " lugares ⭐" + grid["avg_rating"].round(1).astype(str)
+    return grid
+
+
+def build_map_layers(df_map, threshold=MAP_CLUSTER_THRESHOLD):
+    """
+    Retorna (layers, aggregated) para el mapa.
+    Si hay más lugares que 'threshold', se envían celdas agregadas en lugar de puntos.
+    """
+    if len(df_map) > threshold:
+        grid = aggregate_grid(df_map)
+        # El radio crece con la cantidad de lugares en la celda
+        grid["radius"] = 300 * np.sqrt(grid["count"])
+        data = grid
+        radius = "radius"
+        aggregated = True
+    else:
+        data = df_map[["latitude", "longitude", "location_name", "rating"]].copy()
+        data["label"] = build_labels(data)
+        radius = 300
+        aggregated = False
+
+    # Capa de dispersión para las ubicaciones
+    scatter_layer = pdk.Layer(
+        "ScatterplotLayer",
+        data=data,
+        get_position='[longitude, latitude]',
+        get_fill_color='[255, 105, 180, 160]',
+        get_radius=radius,
+        pickable=True
+    )
+    # Capa de texto para mostrar el nombre + rating (o conteo + rating promedio)
+    text_layer = pdk.Layer(
+        "TextLayer",
+        data=data,
+        get_position='[longitude, latitude]',
+        get_text="label",
+        get_size=16,
+        get_color=[0, 0, 0],
+        get_angle=0,
+        get_text_anchor="'middle'",
+        get_alignment_baseline="'bottom'"
+    )
+    return [scatter_layer, text_layer], aggregated
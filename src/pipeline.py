@@ -0,0 +1,115 @@
+"""
+Módulo: pipeline.py
+Orquesta la descarga de reseñas (etapa de I/O, en hilos) y su limpieza y análisis
+de sentimiento (etapa de CPU, en procesos), con control de presión entre ambas etapas.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from src.text_processing import clean_text
+from src.sentiment_analysis import score_sentiment_batch, label_from_polarity
+from src.language_detection import detect_languages
+from src import profiling
+
+
+def enrich_reviews(reviews):
+    """
+    Agrega 'text_clean', 'detected_language', 'polarity', 'subjectivity' y 'sentiment'
+    a cada reseña de un lote.
+    Se ejecuta en los procesos de la etapa de CPU, por eso recibe y devuelve
+    listas de dicts (serializables) en lugar de DataFrames.
+    Parámetros:
+      reviews (list): Lista de dicts con al menos la llave 'text'.
+    Retorna:
+      La misma lista con las columnas nuevas.
+    """
+    with profiling.stage("clean_text"):
+        texts = [clean_text(review.get("text") or "", review.get("language") or "") for review in reviews]
+    # El idioma se detecta para todo el lote y cada idioma se califica en bloque con su modelo
+    with profiling.stage("detect_languages"):
+        languages = detect_languages(texts)
+    with profiling.stage("sentiment"):
+        scores = score_sentiment_batch(texts, languages)
+    for review, text, lang, (polarity, subjectivity) in zip(reviews, texts, languages, scores):
+        review["text_clean"] = text
+        review["detected_language"] = lang
+        review["polarity"] = polarity
+        review["subjectivity"] = subjectivity
+        review["sentiment"] = label_from_polarity(polarity)
+    return reviews
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def run_pipeline(places, fetch_place, io_workers=8, cpu_workers=None,
+                 batch_size=200, max_pending_batches=None, on_place_done=None, profile=None):
+    """
+    Ejecuta la descarga y el enriquecimiento de varios lugares en paralelo.
+    Parámetros:
+      places (iterable): Elementos a procesar (nombres, place_ids, etc.).
+      fetch_place (callable): Recibe un elemento de 'places' y retorna
+                              (list_of_reviews, general_info). Corre en un hilo.
+      io_workers (int): Hilos para la etapa de red.
+      cpu_workers (int): Procesos para la etapa de CPU (por defecto, todos los núcleos).
+      batch_size (int): Máximo de reseñas por lote enviado a la etapa de CPU.
+      max_pending_batches (int): Lotes pendientes en la etapa de CPU a partir de los
+                                 cuales se deja de lanzar descargas nuevas.
+      on_place_done (callable): Se llama con (place, reviews, general_info) cuando
+                                un lugar termina de descargarse. Corre en el hilo principal.
+      profile (bool): Perfilar la etapa de CPU (ver profiling). Con None se usa el valor global.
+    Retorna:
+      (all_reviews, general_data): reseñas enriquecidas e información general de los lugares.
+    """
+    cpu_workers = cpu_workers or os.cpu_count() or 1
+    # Con el perfilado activo, cada proceso devuelve sus estadísticas junto con el lote
+    profile = profiling.is_enabled() if profile is None else profile
+    max_pending_batches = max_pending_batches or cpu_workers * 2
+    places = iter(places)
+
+    all_reviews = []
+    general_data = []
+    fetching = {}
+    enriching = set()
+
+    with ThreadPoolExecutor(max_workers=io_workers) as io_pool, \
+            ProcessPoolExecutor(max_workers=cpu_workers) as cpu_pool:
+
+        def submit_fetches():
+            # Backpressure: solo se lanzan descargas mientras la etapa de CPU tenga capacidad.
+            while len(fetching) < io_workers and len(enriching) < max_pending_batches:
+                place = next(places, None)
+                if place is None:
+                    return
+                fetching[io_pool.submit(fetch_place, place)] = place
+
+        submit_fetches()
+        while fetching or enriching:
+            done, _ = wait(set(fetching) | enriching, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in enriching:
+                    enriching.discard(future)
+                    batch = future.result()
+                    if profile:
+                        batch, stats = batch
+                        profiling.merge_exported(stats)
+                    all_reviews.extend(batch)
+                    continue
+
+                place = fetching.pop(future)
+                reviews, general_info = future.result()
+                if general_info:
+                    general_data.append(general_info)
+                for batch in _chunks(reviews, batch_size):
+                    if profile:
+                        enriching.add(cpu_pool.submit(profiling.run_profiled, "enrich_reviews", enrich_reviews, batch))
+                    else:
+                        enriching.add(cpu_pool.submit(enrich_reviews, batch))
+                if on_place_done:
+                    on_place_done(place, reviews, general_info)
+            submit_fetches()
+
+    return all_reviews, general_data
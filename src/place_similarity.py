@@ -0,0 +1,182 @@
+"""
+Módulo: place_similarity.py
+Similitud entre lugares según lo que dicen sus reseñas: un vector TF-IDF disperso por lugar
+(a partir de text_clean) y similitud coseno calculada por bloques de filas, conservando solo
+los k lugares más parecidos de cada uno (nunca se arma la matriz densa N x N).
+El resultado se guarda en caché por hash del conjunto de reseñas.
+
+Requiere scipy (pip install scipy).
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy import sparse
+except ImportError:  # Dependencia opcional: el resto de la app funciona sin ella
+    sparse = None
+
+from src.exports import dataset_hash
+from src.rollups import STOPWORDS
+from src.text_index import tokenize
+
+TOP_K = 10
+# Máximo de celdas de las matrices densas por bloque (filas del bloque x lugares o términos)
+MAX_BLOCK_CELLS = 20_000_000
+MAX_CACHED_MODELS = 4
+
+_model_cache = OrderedDict()
+
+
+def is_available():
+    return sparse is not None
+
+
+class PlaceSimilarity:
+    """
+    Vectores TF-IDF por lugar y sus k vecinos más parecidos.
+      - place_ids, names: un elemento por fila de la matriz
+      - vocabulary: término de cada columna
+      - matrix: matriz dispersa (lugares x términos) con filas normalizadas (norma L2)
+      - neighbors, scores: (lugares x k) índices de los lugares más parecidos y su similitud
+    """
+
+    def __init__(self, place_ids, names, vocabulary, matrix, top_k=TOP_K):
+        self.place_ids = place_ids
+        self.names = names
+        self.vocabulary = vocabulary
+        self.matrix = matrix
+        self._rows = {place_id: row for row, place_id in enumerate(place_ids)}
+        self.neighbors, self.scores = _top_k_cosine(matrix, top_k)
+
+    def __len__(self):
+        return len(self.place_ids)
+
+    def _row_weights(self, row):
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        return dict(zip(self.matrix.indices[start:end], self.matrix.data[start:end]))
+
+    def compare_terms(self, place_id, other_id, n=5):
+        """
+        Términos que comparten dos lugares y términos que distinguen a 'other_id'.
+        Retorna:
+          (shared, distinctive): listas de términos ordenadas por peso.
+        """
+        own = self._row_weights(self._rows[place_id])
+        other = self._row_weights(self._rows[other_id])
+        shared = sorted((col for col in own.keys() & other.keys()), key=lambda col: -min(own[col], other[col]))
+        distinctive = sorted(other, key=lambda col: -(other[col] - own.get(col, 0.0)))
+        distinctive = [col for col in distinctive if other[col] > own.get(col, 0.0)]
+        return [self.vocabulary[col] for col in shared[:n]], [self.vocabulary[col] for col in distinctive[:n]]
+
+    def similar(self, place_id, n=TOP_K, n_terms=5):
+        """
+        Lugares más parecidos a 'place_id'.
+        Retorna:
+          DataFrame con place_id, location_name, similarity, shared_terms y distinctive_terms.
+        """
+        row = self._rows.get(place_id)
+        records = []
+        if row is not None:
+            for neighbor, score in zip(self.neighbors[row][:n], self.scores[row][:n]):
+                if neighbor < 0 or score <= 0:
+                    break
+                other_id = self.place_ids[neighbor]
+                shared, distinctive = self.compare_terms(place_id, other_id, n_terms)
+                records.append({
+                    "place_id": other_id,
+                    "location_name": self.names[neighbor],
+                    "similarity": float(score),
+                    "shared_terms": ", ".join(shared),
+                    "distinctive_terms": ", ".join(distinctive)
+                })
+        return pd.DataFrame(records, columns=["place_id", "location_name", "similarity", "shared_terms", "distinctive_terms"])
+
+
+def build_term_matrix(df):
+    """
+    Matriz dispersa TF-IDF de lugares x términos a partir de 'text_clean'.
+    TF con escala logarítmica, IDF suavizado y filas normalizadas.
+    Retorna:
+      (place_ids, names, vocabulary, matrix)
+    """
+    grouped = df.groupby("place_id", sort=True)
+    place_ids = list(grouped.groups)
+    names = grouped["location_name"].first().reindex(place_ids).tolist() if "location_name" in df.columns else place_ids
+
+    vocabulary = {}
+    rows, cols = [], []
+    for row, (_, texts) in enumerate(grouped["text_clean"]):
+        for text in texts.dropna():
+            for term in tokenize(text):
+                if len(term) > 2 and term not in STOPWORDS:
+                    rows.append(row)
+                    cols.append(vocabulary.setdefault(term, len(vocabulary)))
+
+    counts = sparse.coo_matrix(
+        (np.ones(len(rows), dtype=np.float32), (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64))),
+        shape=(len(place_ids), len(vocabulary))
+    ).tocsr()  # Se suman las repeticiones de cada (lugar, término)
+    counts.data = np.log1p(counts.data)
+
+    doc_freq = np.bincount(counts.indices, minlength=len(vocabulary))
+    idf = np.log((1 + len(place_ids)) / (1 + doc_freq)).astype(np.float32) + 1
+    tfidf = counts.multiply(idf[np.newaxis, :]).tocsr()
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    tfidf = sparse.diags(1 / norms).dot(tfidf).tocsr().astype(np.float32)
+
+    terms = np.empty(len(vocabulary), dtype=object)
+    for term, col in vocabulary.items():
+        terms[col] = term
+    return place_ids, names, terms, tfidf
+
+
+def _top_k_cosine(matrix, k):
+    """
+    Los k vecinos más parecidos de cada fila (producto punto de filas normalizadas),
+    calculados por bloques de filas. Los lugares sin vecinos suficientes se rellenan con -1.
+    """
+    n = matrix.shape[0]
+    k = min(k, max(n - 1, 0))
+    neighbors = np.full((n, k), -1, dtype=np.int64)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return neighbors, scores
+
+    # Cada bloque de filas se pasa a denso (términos x bloque) para multiplicarlo por la
+    # matriz dispersa completa; el resultado denso es de (bloque x lugares)
+    block = max(1, MAX_BLOCK_CELLS // max(n, matrix.shape[1]))
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        similarity = np.ascontiguousarray((matrix @ matrix[start:end].T.toarray()).T)
+        similarity[np.arange(end - start), np.arange(start, end)] = -1  # Sin el propio lugar
+        top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        neighbors[start:end] = np.take_along_axis(top, order, axis=1)
+        scores[start:end] = np.take_along_axis(top_scores, order, axis=1)
+    return neighbors, scores
+
+
+def place_similarity(df, top_k=TOP_K):
+    """
+    Modelo de similitud para las reseñas de 'df', tomado del caché si el conjunto de
+    reseñas (place_id, location_name, text_clean) no cambió.
+    """
+    if sparse is None:
+        raise ImportError("La similitud entre lugares requiere scipy (pip install scipy)")
+    columns = [col for col in ("place_id", "location_name", "text_clean") if col in df.columns]
+    key = (dataset_hash(df[columns]), top_k)
+    model = _model_cache.get(key)
+    if model is not None:
+        _model_cache.move_to_end(key)
+        return model
+
+    model = PlaceSimilarity(*build_term_matrix(df), top_k=top_k)
+    _model_cache[key] = model
+    while len(_model_cache) > MAX_CACHED_MODELS:
+        _model_cache.popitem(last=False)
+    return model
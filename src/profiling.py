@@ -0,0 +1,323 @@
+"""
+Módulo: profiling.py
+Perfilado opcional por etapas con cProfile. Cada etapa se marca con:
+
+    with stage("wordcloud"):
+        ...
+
+Si el perfilado está apagado (por defecto) la etapa no hace nada. El valor global se activa con
+la variable de entorno PROFILE_STAGES=1 o con set_enabled(True); cada etapa puede activarlo o
+desactivarlo por su cuenta con stage(nombre, enabled) (p. ej. según la sesión de Streamlit) y las
+etapas anidadas heredan el valor de la exterior. Con PROFILE_STAGES=time solo se mide la duración
+de cada etapa, sin cProfile (p. ej. para benchmarks). Las estadísticas de cada etapa se acumulan
+entre ejecuciones (reruns de Streamlit) hasta llamar a reset_stats().
+
+Las estadísticas se acumulan por sesión: stage(nombre, enabled, session) las guarda bajo
+'session' (p. ej. un id guardado en st.session_state) y las etapas anidadas heredan la sesión de
+la exterior. Las funciones de consulta y reset_stats() reciben la misma sesión; con None usan la
+de la etapa en curso o, fuera de toda etapa, la sesión None (scripts, benchmarks, procesos hijos).
+
+Solo un perfilador puede estar activo a la vez en el proceso: la etapa que lo tiene perfila
+y las etapas que corren al mismo tiempo en otros hilos solo registran su duración. Las etapas
+anidadas pausan a la etapa exterior, así cada función se cuenta en la etapa más interna.
+"""
+
+import cProfile
+import marshal
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+_enabled = os.getenv("PROFILE_STAGES", "") not in ("", "0")
+_timing_only = os.getenv("PROFILE_STAGES", "") == "time"
+_lock = threading.Lock()          # protege _sessions
+_profiler_lock = threading.Lock()  # lo tiene el hilo que está perfilando
+_owner = None
+_local = threading.local()
+# sesión -> {"stats": {etapa: pstats.Stats acumulado}, "timings": {etapa: [ejecuciones, segundos]}}
+_sessions = {}
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_enabled(enabled, timing_only=None):
+    """
+    Activa o desactiva el perfilado global del proceso (el que usan las etapas sin 'enabled').
+    Con timing_only=True solo se miden duraciones
+    (None conserva el modo actual). También ajusta PROFILE_STAGES para que los procesos
+    de la etapa de CPU creados después hereden la configuración.
+    """
+    global _enabled, _timing_only
+    _enabled = bool(enabled)
+    if timing_only is not None:
+        _timing_only = bool(timing_only)
+    os.environ["PROFILE_STAGES"] = ("time" if _timing_only else "1") if _enabled else "0"
+
+
+def _current_session():
+    context = getattr(_local, "context", None)
+    return context[-1][1] if context else None
+
+
+def _accumulated(session):
+    # Debe llamarse con _lock tomado
+    return _sessions.setdefault(session, {"stats": {}, "timings": {}})
+
+
+def reset_stats(session=None):
+    """
+    Descarta las estadísticas acumuladas de la sesión (None = la de la etapa en curso).
+    """
+    session = _current_session() if session is None else session
+    with _lock:
+        _sessions.pop(session, None)
+
+
+class _RawStats:
+    # Adaptador para construir pstats.Stats a partir de un dict ya calculado
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _add_stats(stats, name, raw_stats):
+    # Debe llamarse con _lock tomado
+    if not raw_stats:
+        return
+    if name in stats:
+        stats[name].add(_RawStats(raw_stats))
+    else:
+        stats[name] = pstats.Stats(_RawStats(dict(raw_stats)))
+
+
+def _record(name, session, elapsed, profiler=None):
+    raw_stats = None
+    if profiler is not None:
+        profiler.create_stats()
+        raw_stats = profiler.stats
+    with _lock:
+        accumulated = _accumulated(session)
+        timing = accumulated["timings"].setdefault(name, [0, 0.0])
+        timing[0] += 1
+        timing[1] += elapsed
+        _add_stats(accumulated["stats"], name, raw_stats)
+
+
+def _after_fork():
+    # Un proceso hijo no hereda el perfilado en curso del proceso padre
+    global _lock, _profiler_lock, _owner, _local
+    _lock = threading.Lock()
+    _profiler_lock = threading.Lock()
+    _owner = None
+    _local = threading.local()
+    _sessions.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+@contextmanager
+def stage(name, enabled=None, session=None):
+    """
+    Marca una etapa a perfilar. Sin efecto si el perfilado está apagado.
+    'enabled' lo activa o desactiva solo para esta etapa y las anidadas; con None se usa
+    el valor de la etapa exterior o, fuera de toda etapa, el valor global.
+    'session' indica bajo qué sesión se acumulan las estadísticas; con None se usa la de
+    la etapa exterior.
+    """
+    context = getattr(_local, "context", None)
+    if context is None:
+        context = _local.context = []
+    outer_enabled, outer_session = context[-1] if context else (_enabled, None)
+    enabled = outer_enabled if enabled is None else bool(enabled)
+    session = outer_session if session is None else session
+    context.append((enabled, session))
+    try:
+        if not enabled:
+            yield
+        else:
+            with _profile(name, session):
+                yield
+    finally:
+        context.pop()
+
+
+@contextmanager
+def _profile(name, session):
+    global _owner
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    me = threading.get_ident()
+    acquired = False
+    if _owner == me:
+        # Etapa anidada: se pausa el perfilador de la etapa exterior
+        stack[-1].disable()
+    elif not _timing_only and _profiler_lock.acquire(blocking=False):
+        acquired = True
+        _owner = me
+    else:
+        # Solo se mide el tiempo (modo de tiempos u otro hilo está perfilando)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            _record(name, session, time.perf_counter() - start)
+        return
+
+    profiler = cProfile.Profile()
+    stack.append(profiler)
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        _record(name, session, elapsed, profiler)
+        if stack:
+            stack[-1].enable()
+        if acquired:
+            _owner = None
+            _profiler_lock.release()
+
+
+def run_profiled(name, fn, *args, **kwargs):
+    """
+    Ejecuta fn dentro de la etapa 'name' en un proceso hijo y retorna (resultado, estadísticas)
+    para enviarlas al proceso principal (ver merge_exported). Descarta lo acumulado antes en
+    el proceso, por eso no debe usarse en el proceso principal. La etapa se perfila aunque el
+    perfilado global del hijo esté apagado (lo activó una sesión del proceso principal).
+    """
+    reset_stats()
+    with stage(name, enabled=True):
+        result = fn(*args, **kwargs)
+    return result, export_state()
+
+
+def export_state(session=None):
+    """
+    Estadísticas acumuladas de la sesión en un formato serializable (pickle) entre procesos.
+    """
+    session = _current_session() if session is None else session
+    with _lock:
+        accumulated = _sessions.get(session, {"stats": {}, "timings": {}})
+        stats, timings = accumulated["stats"], accumulated["timings"]
+        return {
+            name: (list(timings[name]), dict(stats[name].stats) if name in stats else None)
+            for name in timings
+        }
+
+
+def merge_exported(state, session=None):
+    """
+    Agrega las estadísticas de export_state() (p. ej. de un proceso hijo) a las de la sesión
+    (None = la de la etapa en curso).
+    """
+    session = _current_session() if session is None else session
+    with _lock:
+        accumulated = _accumulated(session)
+        for name, ((runs, seconds), raw_stats) in state.items():
+            timing = accumulated["timings"].setdefault(name, [0, 0.0])
+            timing[0] += runs
+            timing[1] += seconds
+            _add_stats(accumulated["stats"], name, raw_stats)
+
+
+def stage_summary(session=None):
+    """
+    Resumen por etapa de la sesión: lista de dicts con stage, runs, total_s y mean_s
+    (de mayor a menor tiempo).
+    """
+    session = _current_session() if session is None else session
+    with _lock:
+        timings = _sessions.get(session, {}).get("timings", {})
+        rows = [
+            {"stage": name, "runs": runs, "total_s": seconds, "mean_s": seconds / runs if runs else 0.0}
+            for name, (runs, seconds) in timings.items()
+        ]
+    return sorted(rows, key=lambda row: row["total_s"], reverse=True)
+
+
+def top_functions(name=None, limit=20, session=None):
+    """
+    Funciones con más tiempo propio en una etapa (o en todas si name es None) de la sesión.
+    Retorna:
+      Lista de dicts con function, calls, tottime_s y cumtime_s.
+    """
+    combined = _combined_stats(name, session)
+    rows = [
+        {"function": pstats.func_std_string(func), "calls": nc, "tottime_s": tt, "cumtime_s": ct}
+        for func, (cc, nc, tt, ct, callers) in combined.items()
+    ]
+    return sorted(rows, key=lambda row: row["tottime_s"], reverse=True)[:limit]
+
+
+def _session_stats(session):
+    # Debe llamarse con _lock tomado
+    session = _current_session() if session is None else session
+    return _sessions.get(session, {}).get("stats", {})
+
+
+def _combined_stats(name=None, session=None):
+    with _lock:
+        stats = _session_stats(session)
+        selected = [stats[stage_name] for stage_name in ([name] if name else list(stats)) if stage_name in stats]
+        if not selected:
+            return {}
+        aggregate = pstats.Stats(_RawStats(dict(selected[0].stats)))
+        for stats in selected[1:]:
+            aggregate.add(stats)
+        return aggregate.stats
+
+
+def dump_pstats(name=None, session=None):
+    """
+    Estadísticas de una etapa (o de todas) de la sesión en formato .pstats, legible con
+    pstats.Stats(archivo), snakeviz o gprof2dot.
+    """
+    return marshal.dumps(_combined_stats(name, session))
+
+
+def collapsed_stacks(name=None, session=None):
+    """
+    Estadísticas en formato "collapsed" (una pila por línea y su peso en microsegundos),
+    listo para flamegraph.pl o speedscope. cProfile solo guarda pares llamador -> llamado,
+    así que cada pila tiene la forma etapa;llamador;función con el tiempo propio de la función.
+    """
+    with _lock:
+        stats = _session_stats(session)
+        names = [name] if name else list(stats)
+        items = [(stage_name, dict(stats[stage_name].stats)) for stage_name in names if stage_name in stats]
+
+    lines = []
+    for stage_name, stats in items:
+        for func, (cc, nc, tt, ct, callers) in stats.items():
+            label = _frame_label(func)
+            total_calls = sum(caller_stats[1] for caller_stats in callers.values())
+            if not callers or not total_calls:
+                micros = int(tt * 1e6)
+                if micros:
+                    lines.append(f"{stage_name};{label} {micros}")
+                continue
+            # El tiempo propio se reparte entre los llamadores según la cantidad de llamadas
+            for caller, caller_stats in callers.items():
+                micros = int(tt * 1e6 * caller_stats[1] / total_calls)
+                if micros:
+                    lines.append(f"{stage_name};{_frame_label(caller)};{label} {micros}")
+    return "\n".join(lines) + "\n"
+
+
+def _frame_label(func):
+    filename, line, function = func
+    if filename == "~":
+        return function
+    return f"{function} ({os.path.basename(filename)}:{line})".replace(";", ",")
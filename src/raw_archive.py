@@ -0,0 +1,234 @@
+"""
+Módulo: raw_archive.py
+Archivo de solo-agregar con las respuestas completas (JSON) de la API de Places.
+Permite volver a procesar reseñas con nuevas reglas de limpieza o sentimiento sin
+volver a consultar la API, y servir las consultas desde el archivo (modo replay).
+
+Estructura en disco (dentro de 'root'):
+  AAAA-MM/<host>-<pid>-<inicio>.jsonl.gz   Registros; cada uno es un miembro gzip independiente
+  AAAA-MM/<host>-<pid>-<inicio>.idx        Una línea JSON por registro: llave, fecha y posición
+
+Cada proceso escribe en su propio segmento, así que varios procesos pueden agregar a la vez.
+
+Reprocesar todo el archivo con el análisis actual:
+  python -m src.raw_archive data/raw_archive data/reprocessed.csv
+"""
+
+import gzip
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+
+# Tamaño a partir del cual se abre un segmento nuevo
+MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+# Parámetros que no forman parte de la llave (la API key no se guarda)
+_EXCLUDED_PARAMS = {"key"}
+# Status de respuestas que vale la pena archivar y servir en replay; los errores (cuota,
+# solicitud inválida, etc.) son pasajeros y no deben ocultar una respuesta buena anterior
+ARCHIVED_STATUSES = {"OK", "ZERO_RESULTS"}
+
+
+def _to_utc(value):
+    """
+    Convierte 'value' (str ISO 8601 o datetime) en datetime con zona horaria UTC.
+    Las fechas sin zona se toman como UTC; una fecha sin hora ("2024-05-01") se toma
+    como el final de ese día, para que el límite lo incluya completo.
+    """
+    if isinstance(value, str):
+        text = value.strip()
+        parsed = datetime.fromisoformat(text)
+        if len(text) == 10:
+            parsed += timedelta(days=1, microseconds=-1)
+        value = parsed
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def request_key(endpoint, params):
+    """
+    Llave de una consulta: endpoint + parámetros ordenados, sin la API key.
+    """
+    clean = {k: str(v) for k, v in params.items() if k not in _EXCLUDED_PARAMS and v not in (None, "")}
+    return endpoint + "?" + "&".join(f"{k}={clean[k]}" for k in sorted(clean))
+
+
+class RawArchive:
+    """
+    Archivo comprimido de respuestas crudas de la API.
+      - append(): agrega una respuesta (nunca modifica registros anteriores)
+      - lookup(): respuesta válida más reciente para una consulta (opcionalmente hasta 'as_of')
+      - records(): recorre todos los registros en orden de escritura
+    """
+
+    def __init__(self, root, max_segment_bytes=MAX_SEGMENT_BYTES):
+        self.root = root
+        self.max_segment_bytes = max_segment_bytes
+        self._lock = threading.Lock()
+        self._segment = None
+        self._index = None  # llave -> [(fetched_at, segmento, posición)], se carga al primer lookup
+
+    def _new_segment(self, now):
+        folder = os.path.join(self.root, now.strftime("%Y-%m"))
+        os.makedirs(folder, exist_ok=True)
+        name = f"{socket.gethostname()}-{os.getpid()}-{now.strftime('%Y%m%dT%H%M%S%f')}"
+        return os.path.join(folder, name + ".jsonl.gz")
+
+    def append(self, endpoint, params, payload, fetched_at=None):
+        """
+        Agrega la respuesta 'payload' de una consulta al endpoint con 'params'.
+        """
+        now = fetched_at or datetime.now(timezone.utc)
+        key = request_key(endpoint, params)
+        record = {
+            "endpoint": endpoint,
+            "params": {k: v for k, v in params.items() if k not in _EXCLUDED_PARAMS},
+            "fetched_at": now.isoformat(),
+            "payload": payload
+        }
+        # Un miembro gzip por registro: se puede leer uno solo a partir de su posición
+        data = gzip.compress((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        with self._lock:
+            # Un segmento por proceso (después de un fork el hijo abre el suyo)
+            if (self._segment is None or self._segment[1] != os.getpid()
+                    or os.path.getsize(self._segment[0]) >= self.max_segment_bytes):
+                self._segment = (self._new_segment(now), os.getpid())
+            path = self._segment[0]
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(data)
+            with open(path[:-len(".jsonl.gz")] + ".idx", "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "fetched_at": record["fetched_at"], "offset": offset}) + "\n")
+            if self._index is not None:
+                self._index.setdefault(key, []).append((record["fetched_at"], path, offset))
+
+    def _segments(self):
+        if not os.path.isdir(self.root):
+            return []
+        paths = []
+        for folder in sorted(os.listdir(self.root)):
+            folder_path = os.path.join(self.root, folder)
+            if os.path.isdir(folder_path):
+                paths.extend(os.path.join(folder_path, name) for name in sorted(os.listdir(folder_path))
+                             if name.endswith(".jsonl.gz"))
+        return paths
+
+    def _load_index(self):
+        index = {}
+        for path in self._segments():
+            idx_path = path[:-len(".jsonl.gz")] + ".idx"
+            if not os.path.exists(idx_path):
+                continue
+            with open(idx_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Línea incompleta (proceso interrumpido al escribir)
+                    index.setdefault(entry["key"], []).append((entry["fetched_at"], path, entry["offset"]))
+        for entries in index.values():
+            entries.sort()
+        return index
+
+    @staticmethod
+    def _read_member(path, offset):
+        with open(path, "rb") as f:
+            f.seek(offset)
+            decompressor = zlib.decompressobj(wbits=31)
+            chunks = []
+            while not decompressor.eof:
+                block = f.read(64 * 1024)
+                if not block:
+                    break
+                chunks.append(decompressor.decompress(block))
+        return json.loads(b"".join(chunks))
+
+    def lookup(self, endpoint, params, as_of=None):
+        """
+        Respuesta guardada más reciente para la consulta con status en ARCHIVED_STATUSES,
+        o None si no existe. Con 'as_of' (ISO 8601 o datetime; sin zona se toma como UTC)
+        se usa la última respuesta obtenida hasta ese momento; una fecha sin hora incluye
+        todo ese día.
+        """
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            entries = list(self._index.get(request_key(endpoint, params), ()))
+        if as_of:
+            limit = _to_utc(as_of)
+            entries = [entry for entry in entries if _to_utc(entry[0]) <= limit]
+        # Los archivos anteriores pueden tener errores guardados: se busca hacia atrás
+        for _, path, offset in reversed(entries):
+            payload = self._read_member(path, offset)["payload"]
+            if payload.get("status") in ARCHIVED_STATUSES:
+                return payload
+        return None
+
+    def records(self, endpoint=None):
+        """
+        Recorre todos los registros (dicts con endpoint, params, fetched_at y payload).
+        Un registro incompleto al final de un segmento se omite.
+        """
+        for path in self._segments():
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        record = json.loads(line)
+                        if endpoint is None or record["endpoint"] == endpoint:
+                            yield record
+            except (EOFError, OSError, json.JSONDecodeError) as e:
+                print(f"[WARNING] Segmento incompleto {path}: {e}")
+
+
+def reprocess(root, output_csv, cpu_workers=None, batch_size=500):
+    """
+    Vuelve a extraer, limpiar y analizar todas las reseñas guardadas en el archivo
+    (todas las fechas de consulta), sin llamar a la API.
+    Si una reseña aparece en varias consultas se conserva la más reciente.
+    Retorna:
+      Cantidad de reseñas escritas en 'output_csv'.
+    """
+    # Se importan aquí para que el archivo pueda usarse sin las dependencias del análisis
+    from concurrent.futures import ProcessPoolExecutor
+    import pandas as pd
+    from src.reviews_fetcher import parse_reviews
+    from src.pipeline import enrich_reviews
+
+    start = time.time()
+    reviews_by_id = {}
+    for record in RawArchive(root).records("details"):
+        params = record["params"]
+        result = record["payload"].get("result", {})
+        if record["payload"].get("status") != "OK" or "reviews" not in params.get("fields", ""):
+            continue
+        for review in parse_reviews(params["place_id"], result.get("name", "Unknown"), result.get("reviews", []),
+                                    params.get("language", "")):
+            review["fetched_at"] = record["fetched_at"]
+            previous = reviews_by_id.get(review["review_id"])
+            if previous is None or previous["fetched_at"] <= review["fetched_at"]:
+                reviews_by_id[review["review_id"]] = review
+
+    reviews = list(reviews_by_id.values())
+    batches = [reviews[i:i + batch_size] for i in range(0, len(reviews), batch_size)]
+    enriched = []
+    with ProcessPoolExecutor(max_workers=cpu_workers) as pool:
+        for batch in pool.map(enrich_reviews, batches):
+            enriched.extend(batch)
+
+    os.makedirs(os.path.dirname(output_csv) or ".", exist_ok=True)
+    pd.DataFrame(enriched).to_csv(output_csv, index=False)
+    print(f"[INFO] {len(enriched)} reseñas reprocesadas en {time.time() - start:.1f} s")
+    return len(enriched)
+
+
+if __name__ == "__main__":
+    # Uso: python -m src.raw_archive data/raw_archive data/reprocessed.csv
+    if len(sys.argv) != 3:
+        print("Uso: python -m src.raw_archive <directorio del archivo> <CSV de salida>")
+        sys.exit(1)
+    reprocess(sys.argv[1], sys.argv[2])
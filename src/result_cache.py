@@ -0,0 +1,108 @@
+"""
+Módulo: result_cache.py
+Caché de resultados por lugar (reseñas ya enriquecidas + información general) compartido
+por todo el proceso, con vencimiento (TTL), límite de memoria y copia opcional en disco.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(place_id, language):
+    """
+    Llave del caché para un lugar y un idioma (o lista de idiomas).
+    """
+    if isinstance(language, (list, tuple)):
+        language = "+".join(language)
+    return f"{place_id}|{language or ''}"
+
+
+class ResultCache:
+    """
+    Caché LRU en memoria con TTL y límite de tamaño (en bytes serializados).
+    Si se indica 'disk_dir', cada entrada también se guarda en disco y se recupera
+    de ahí cuando no está en memoria (p. ej. después de reiniciar el servidor).
+    """
+
+    def __init__(self, ttl_seconds=3600, max_bytes=256 * 1024 * 1024, disk_dir=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pkl")
+
+    def get(self, key):
+        """
+        Retorna el valor guardado o None si no existe o ya venció.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, size, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path) and os.path.getmtime(path) + self.ttl_seconds > now:
+                with open(path, "rb") as f:
+                    payload = f.read()
+                value = pickle.loads(payload)
+                with self._lock:
+                    self._store(key, value, len(payload), os.path.getmtime(path) + self.ttl_seconds)
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        """
+        Guarda un valor. Si supera el límite de memoria se descartan las entradas
+        usadas hace más tiempo.
+        """
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._store(key, value, len(payload), time.time() + self.ttl_seconds)
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            # Temporal propio de cada proceso e hilo: dos sesiones que guardan la misma llave
+            # a la vez no escriben sobre el mismo archivo
+            tmp_path = f"{self._disk_path(key)}.{os.getpid()}-{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._disk_path(key))
+
+    def _store(self, key, value, size, expires_at):
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (expires_at, size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
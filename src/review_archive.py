@@ -0,0 +1,201 @@
+"""
+Módulo: review_archive.py
+Archivo compacto de reseñas en disco: columnas numéricas de ancho fijo en arreglos
+mapeados en memoria (numpy.memmap) y los textos en un bloque binario indexado por
+offsets. Permite leer un lugar y un rango de fechas sin cargar todo el histórico.
+
+Estructura del directorio del archivo:
+  meta.json          lugares, rangos de filas por lugar y cantidad de filas
+  place_idx.i4       índice del lugar de cada fila (int32)
+  time.i8            fecha en segundos UNIX (int64, -1 si no hay fecha)
+  rating.f4          rating (float32, NaN si no hay)
+  text_offsets.i8    offset de inicio de cada texto en el bloque (int64, n + 1 valores)
+  text.bin           textos UTF-8 concatenados (columnas de texto separadas por \\x1f)
+Las filas están ordenadas por (lugar, fecha), así que cada lugar ocupa un tramo
+contiguo y el rango de fechas se resuelve con búsqueda binaria.
+"""
+
+import datetime
+import glob
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+TEXT_COLUMNS = ["review_id", "author_name", "text"]
+FIELD_SEP = "\x1f"
+
+
+def convert_csv_to_archive(csv_paths, archive_dir):
+    """
+    Convierte uno o varios CSV de reseñas (p. ej. data/last5perplace/*.csv) al formato de archivo.
+    Las reseñas repetidas entre CSV (mismo lugar, autor y fecha) se guardan una sola vez.
+    Parámetros:
+      csv_paths (list | str): Rutas o patrón glob de los CSV.
+      archive_dir (str): Directorio de salida.
+    Retorna:
+      Cantidad de reseñas escritas.
+    """
+    if isinstance(csv_paths, str):
+        csv_paths = sorted(glob.glob(csv_paths))
+    frames = [pd.read_csv(path, dtype={"place_id": str}) for path in csv_paths]
+    if not frames:
+        return 0
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates(subset=["place_id", "author_name", "datetime_utc"], keep="last")
+
+    times = pd.to_datetime(df["datetime_utc"], errors="coerce")
+    df["_time"] = ((times - pd.Timestamp("1970-01-01")) // pd.Timedelta(seconds=1)).fillna(-1).astype(np.int64)
+    df = df.sort_values(["place_id", "_time"], kind="stable").reset_index(drop=True)
+
+    places = df.drop_duplicates("place_id", keep="last")[["place_id", "location_name"]]
+    place_ids = list(places["place_id"])
+    place_codes = pd.Categorical(df["place_id"], categories=place_ids).codes.astype(np.int32)
+    # Tramo de filas [inicio, fin) de cada lugar
+    starts = np.searchsorted(place_codes, np.arange(len(place_ids)), side="left")
+    ends = np.searchsorted(place_codes, np.arange(len(place_ids)), side="right")
+
+    os.makedirs(archive_dir, exist_ok=True)
+    n = len(df)
+    _write_column(archive_dir, "place_idx.i4", place_codes)
+    _write_column(archive_dir, "time.i8", df["_time"].to_numpy(dtype=np.int64))
+    _write_column(archive_dir, "rating.f4", pd.to_numeric(df.get("rating"), errors="coerce").to_numpy(dtype=np.float32))
+
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    with open(os.path.join(archive_dir, "text.bin"), "wb") as f:
+        # El separador de campos no puede aparecer dentro de los textos
+        columns = [
+            df[col].fillna("").astype(str).str.replace(FIELD_SEP, " ", regex=False) if col in df.columns else [""] * n
+            for col in TEXT_COLUMNS
+        ]
+        for i, values in enumerate(zip(*columns)):
+            blob = FIELD_SEP.join(values).encode("utf-8")
+            f.write(blob)
+            offsets[i + 1] = offsets[i] + len(blob)
+    _write_column(archive_dir, "text_offsets.i8", offsets)
+
+    meta = {
+        "rows": n,
+        "places": [
+            {"place_id": pid, "location_name": name, "start": int(s), "end": int(e)}
+            for pid, name, s, e in zip(place_ids, places["location_name"], starts, ends)
+        ]
+    }
+    with open(os.path.join(archive_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return n
+
+
+def _write_column(archive_dir, name, values):
+    values.tofile(os.path.join(archive_dir, name))
+
+
+def _is_date_only(value):
+    # Fecha sin hora: un date (no datetime) o un texto sin parte de hora, como "2024-01-31"
+    if isinstance(value, str):
+        return ":" not in value and pd.Timestamp(value) == pd.Timestamp(value).normalize()
+    return isinstance(value, datetime.date) and not isinstance(value, datetime.datetime)
+
+
+class ReviewArchive:
+    """
+    Lector del archivo de reseñas. Las columnas se abren como memmap, por lo que solo
+    se leen del disco las páginas que realmente se consultan.
+    """
+
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+        with open(os.path.join(archive_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.rows = meta["rows"]
+        self.places = {p["place_id"]: p for p in meta["places"]}
+        self.place_ids = [p["place_id"] for p in meta["places"]]
+        self.place_idx = self._open("place_idx.i4", np.int32)
+        self.time = self._open("time.i8", np.int64)
+        self.rating = self._open("rating.f4", np.float32)
+        self.text_offsets = self._open("text_offsets.i8", np.int64)
+        text_path = os.path.join(archive_dir, "text.bin")
+        self.text = (np.memmap(text_path, dtype=np.uint8, mode="r")
+                     if os.path.getsize(text_path) else np.zeros(0, dtype=np.uint8))
+
+    def _open(self, name, dtype):
+        path = os.path.join(self.archive_dir, name)
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    def __len__(self):
+        return self.rows
+
+    def _row_range(self, place_id, start=None, end=None):
+        place = self.places.get(place_id)
+        if place is None:
+            return 0, 0
+        lo, hi = place["start"], place["end"]
+        times = self.time[lo:hi]
+        # Las filas sin fecha (-1) quedan al inicio del tramo; se excluyen al filtrar por fecha
+        if start is not None:
+            lo += int(np.searchsorted(times, int(pd.Timestamp(start).timestamp()), side="left"))
+        elif end is not None:
+            lo += int(np.searchsorted(times, 0, side="left"))
+        if end is not None:
+            end_ts = pd.Timestamp(end)
+            if _is_date_only(end):
+                # El fin es inclusivo: una fecha sin hora cubre todo ese día
+                end_ts = end_ts + pd.Timedelta(days=1)
+                hi = place["start"] + int(np.searchsorted(times, int(end_ts.timestamp()), side="left"))
+            else:
+                hi = place["start"] + int(np.searchsorted(times, int(end_ts.timestamp()), side="right"))
+        return lo, max(lo, hi)
+
+    def _texts(self, lo, hi):
+        if hi <= lo:
+            return [[] for _ in TEXT_COLUMNS]
+        base = int(self.text_offsets[lo])
+        raw = bytes(self.text[base:int(self.text_offsets[hi])])
+        offsets = self.text_offsets[lo:hi + 1] - base
+        rows = [raw[offsets[i]:offsets[i + 1]].decode("utf-8").split(FIELD_SEP) for i in range(hi - lo)]
+        return [list(col) for col in zip(*rows)]
+
+    def read(self, place_ids=None, start=None, end=None, with_text=True):
+        """
+        Lee reseñas por lugar y rango de fechas (inclusivo).
+        Parámetros:
+          place_ids (list): Lugares a leer (None = todos).
+          start, end: Límites de fecha (str, date, datetime o Timestamp). Opcionales.
+                      Un 'end' sin hora ("2024-01-31") incluye todo ese día.
+          with_text (bool): Si es False solo se leen las columnas numéricas.
+        Retorna:
+          DataFrame con place_id, location_name, datetime_utc, rating y, si se pide,
+          review_id, author_name y text.
+        """
+        frames = []
+        for place_id in (place_ids or self.place_ids):
+            lo, hi = self._row_range(place_id, start, end)
+            if hi <= lo:
+                continue
+            times = np.asarray(self.time[lo:hi])
+            frame = pd.DataFrame({
+                "place_id": place_id,
+                "location_name": self.places[place_id]["location_name"],
+                "datetime_utc": pd.to_datetime(pd.Series(times).where(times >= 0), unit="s"),
+                "rating": np.asarray(self.rating[lo:hi])
+            })
+            if with_text:
+                for col, values in zip(TEXT_COLUMNS, self._texts(lo, hi)):
+                    frame[col] = values
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=["place_id", "location_name", "datetime_utc", "rating"] + (TEXT_COLUMNS if with_text else []))
+        return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    # Uso: python -m src.review_archive "data/last5perplace/*.csv" data/archive
+    if len(sys.argv) != 3:
+        print('Uso: python -m src.review_archive "<patrón de CSV>" <directorio de salida>')
+        sys.exit(1)
+    total = convert_csv_to_archive(sys.argv[1], sys.argv[2])
+    print(f"[INFO] Se escribieron {total} reseñas en {sys.argv[2]}")
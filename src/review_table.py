@@ -0,0 +1,104 @@
+"""
+Módulo: review_table.py
+Filtrado, orden y paginación de la tabla de reseñas del lado del servidor, para que la
+página solo reciba (y estilice) las filas visibles.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+
+def build_review_index(df):
+    """
+    Construye índices sobre el DataFrame de reseñas para filtrar sin recorrerlo completo.
+    Parámetros:
+      df (DataFrame): Reseñas con columnas location_name, sentiment, rating y datetime_utc.
+    Retorna:
+      dict con:
+        - 'location_name', 'sentiment', 'rating': {valor: posiciones (np.array)}
+        - 'date_order': posiciones ordenadas por fecha
+        - 'date_values': fechas ordenadas (int64 en nanosegundos, NaT al final)
+    """
+    index = {}
+    for col in ("location_name", "sentiment", "rating"):
+        if col in df.columns:
+            index[col] = {key: np.asarray(pos) for key, pos in df.groupby(col, sort=False).indices.items()}
+
+    if "datetime_utc" in df.columns:
+        dates = pd.to_datetime(df["datetime_utc"], errors="coerce")
+        order = np.argsort(dates.to_numpy(dtype="datetime64[ns]"), kind="stable")
+        index["date_order"] = order
+        index["date_values"] = dates.to_numpy(dtype="datetime64[ns]")[order]
+    return index
+
+
+def _positions_for(index, col, values):
+    postings = index.get(col, {})
+    found = [postings[v] for v in values if v in postings]
+    if not found:
+        return np.array([], dtype=np.intp)
+    return np.concatenate(found)
+
+
+def filter_reviews(df, index, places=None, sentiments=None, date_range=None, rating_range=None):
+    """
+    Filtra reseñas usando los índices de build_review_index().
+    Parámetros:
+      df (DataFrame): Reseñas originales.
+      index (dict): Índices construidos con build_review_index(df).
+      places (list): Nombres de lugar a incluir (None o vacío = todos).
+      sentiments (list): Sentimientos a incluir (None o vacío = todos).
+      date_range (tuple): (inicio, fin) de fechas, inclusivo. Cualquiera puede ser None.
+      rating_range (tuple): (mínimo, máximo) de rating, inclusivo.
+    Retorna:
+      Posiciones (np.array ordenado) de las filas que cumplen todos los filtros.
+    """
+    selected = np.arange(len(df))
+
+    if places:
+        selected = np.intersect1d(selected, _positions_for(index, "location_name", places))
+    if sentiments:
+        selected = np.intersect1d(selected, _positions_for(index, "sentiment", sentiments))
+    if rating_range and "rating" in index:
+        low, high = rating_range
+        ratings = [r for r in index["rating"] if pd.notnull(r) and low <= r <= high]
+        selected = np.intersect1d(selected, _positions_for(index, "rating", ratings))
+    if date_range and "date_values" in index:
+        start, end = date_range
+        values = index["date_values"]
+        lo = np.searchsorted(values, np.datetime64(pd.Timestamp(start), "ns")) if start is not None else 0
+        if end is not None:
+            # El fin es inclusivo: se toma hasta el final del día indicado
+            end_ts = pd.Timestamp(end) + pd.Timedelta(days=1)
+            hi = np.searchsorted(values, np.datetime64(end_ts, "ns"), side="left")
+        else:
+            hi = np.searchsorted(values, np.datetime64("NaT"), side="left")
+        selected = np.intersect1d(selected, index["date_order"][lo:hi])
+    return selected
+
+
+def paginate(df, positions, sort_by=None, ascending=True, page=1, page_size=50):
+    """
+    Ordena las filas seleccionadas y retorna solo la página solicitada.
+    Parámetros:
+      df (DataFrame): Reseñas originales.
+      positions (np.array): Posiciones devueltas por filter_reviews().
+      sort_by (str): Columna por la que se ordena (None = orden original).
+      ascending (bool): Sentido del orden.
+      page (int): Número de página (empieza en 1).
+      page_size (int): Filas por página.
+    Retorna:
+      (page_df, total_pages)
+    """
+    total_pages = max(1, math.ceil(len(positions) / page_size))
+    page = min(max(1, page), total_pages)
+
+    if sort_by and len(positions):
+        keys = df[sort_by].to_numpy()[positions]
+        order = pd.Series(keys).sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+        positions = positions[order]
+
+    start = (page - 1) * page_size
+    return df.iloc[positions[start:start + page_size]], total_pages
@@ -1,14 +1,113 @@
+import functools
+import hashlib
+import math
 import os
 import requests
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 from dotenv import load_dotenv
 
+from src.raw_archive import RawArchive, ARCHIVED_STATUSES
+
 # Cargar API Key
 load_dotenv()
 API_KEY = os.getenv("GOOGLE_PLACES_API_KEY")
 
+# Archivo de respuestas crudas (opcional). Con RAW_ARCHIVE_DIR cada respuesta de la API se
+# guarda en el archivo; con RAW_ARCHIVE_MODE=replay las consultas se sirven desde el archivo
+# sin llamar a la API (RAW_ARCHIVE_AS_OF limita la fecha de las respuestas usadas).
+_raw_archive = RawArchive(os.getenv("RAW_ARCHIVE_DIR")) if os.getenv("RAW_ARCHIVE_DIR") else None
+_replay = os.getenv("RAW_ARCHIVE_MODE", "record") == "replay"
+_replay_as_of = os.getenv("RAW_ARCHIVE_AS_OF") or None
+
+
+def configure_raw_archive(root=None, replay=False, as_of=None):
+    """
+    Configura el archivo de respuestas crudas.
+    Parámetros:
+      root (str): Directorio del archivo, o None para desactivarlo.
+      replay (bool): Si es True, las consultas se responden desde el archivo (sin API).
+      as_of (str): En modo replay, usar solo respuestas obtenidas hasta esta fecha (ISO 8601, UTC).
+    """
+    global _raw_archive, _replay, _replay_as_of
+    _raw_archive = RawArchive(root) if root else None
+    _replay = bool(replay and root)
+    _replay_as_of = as_of
+
+
+def _get_json(endpoint, url, params):
+    """
+    Hace la consulta a la API y guarda la respuesta cruda en el archivo (solo si su status
+    está en ARCHIVED_STATUSES), o en modo replay la toma del archivo. Las consultas que no
+    están en el archivo responden NOT_ARCHIVED.
+    """
+    archive = _raw_archive
+    if archive is not None and _replay:
+        payload = archive.lookup(endpoint, params, as_of=_replay_as_of)
+        return payload if payload is not None else {"status": "NOT_ARCHIVED"}
+
+    data = requests.get(url, params=params).json()
+    if archive is not None and data.get("status") in ARCHIVED_STATUSES:
+        try:
+            archive.append(endpoint, params, data)
+        except OSError as e:
+            print(f"[ERROR] No se pudo archivar la respuesta de {endpoint}: {e}")
+    return data
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma llave: la primera hace la consulta y
+    las demás esperan y reciben el mismo resultado (o la misma excepción).
+    Al terminar la llamada la llave se libera; no es un caché.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+# Compartido por todo el proceso (incluye varias sesiones de Streamlit)
+_flights = SingleFlight()
+
+
+def single_flight(key_func):
+    """
+    Decorador: las llamadas concurrentes cuya llave (key_func con los mismos argumentos)
+    coincida comparten una sola consulta a la API.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return _flights.do((fn.__name__, key_func(*args, **kwargs)), fn, *args, **kwargs)
+        return wrapper
+    return decorator
 
+
+@single_flight(lambda business_name: business_name.strip().lower())
 def get_place_id_from_name(business_name):
     url = "https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
     params = {
@@ -18,8 +117,7 @@ def get_place_id_from_name(business_name):
         "fields": "place_id,name,formatted_address"
     }
     try:
-        resp = requests.get(url, params=params)
-        data = resp.json()
+        data = _get_json("findplace", url, params)
         if data.get("status") == "OK" and data.get("candidates"):
             candidate = data["candidates"][0]
             return candidate["place_id"], candidate["name"], candidate["formatted_address"]
@@ -28,21 +126,31 @@ def get_place_id_from_name(business_name):
     return None, None, None
 
 
-def fetch_reviews(place_id, language=""):
+@single_flight(lambda place_id, language="", page_token=None, on_page=None, with_status=False:
+               (place_id, language, page_token, with_status))
+def fetch_reviews(place_id, language="", page_token=None, on_page=None, with_status=False):
     """
     Descarga reseñas usando la Places Details API para un place_id dado.
     Parámetros:
       place_id (str): ID del lugar en Google
       language (str): Código de idioma ("es", "en", etc.). Si se deja vacío, se usa el predeterminado
+      page_token (str): Token de página desde el cual continuar una descarga interrumpida. Opcional.
+      on_page (callable): Se llama con (reviews_de_la_pagina, next_page_token, location_name)
+                          después de cada página, p. ej. para guardar un checkpoint. Opcional.
+                          Si otra llamada igual ya está en curso, se comparte su resultado
+                          y este callback no se invoca.
+      with_status (bool): Si es True, también retorna el estado de la descarga.
     Retorna:
-      (list_of_reviews, location_name)
+      (list_of_reviews, location_name), o (list_of_reviews, location_name, status) con
+      with_status=True. status es "OK" si se descargaron todas las páginas; si no, el
+      status de la API que la interrumpió (p. ej. "OVER_QUERY_LIMIT") o "ERROR" si falló la conexión.
     """
     if not place_id:
-        return [], ""
+        return ([], "", "INVALID_REQUEST") if with_status else ([], "")
     all_reviews = []
     location_name = "Unknown"
     url = "https://maps.googleapis.com/maps/api/place/details/json"
-    next_page_token = None
+    next_page_token = page_token
 
     while True:
         params = {
@@ -56,43 +164,149 @@ def fetch_reviews(place_id, language=""):
             params["pagetoken"] = next_page_token
 
         try:
-            resp = requests.get(url, params=params)
-            data = resp.json()
+            data = _get_json("details", url, params)
         except Exception as e:
             print(f"[ERROR] fetch_reviews: {e}")
+            status = "ERROR"
             break
 
-        if data.get("status") != "OK":
+        status = data.get("status", "ERROR")
+        if status != "OK":
             break
 
         result = data.get("result", {})
         if location_name == "Unknown":
             location_name = result.get("name", "Unknown")
 
-        reviews = result.get("reviews", [])
-        for r in reviews:
-            utime = r.get("time")
-            dt_utc = None
-            if utime:
-                dt_utc = datetime.utcfromtimestamp(utime).strftime("%Y-%m-%d %H:%M:%S")
-            review_item = {
-                "place_id": place_id,
-                "location_name": location_name,
-                "author_name": r.get("author_name"),
-                "rating": r.get("rating"),
-                "datetime_utc": dt_utc,
-                "text": r.get("text", "")
-            }
-            all_reviews.append(review_item)
+        page_reviews = parse_reviews(place_id, location_name, result.get("reviews", []), language)
+        all_reviews.extend(page_reviews)
 
         next_page_token = data.get("next_page_token")
+        if on_page:
+            on_page(page_reviews, next_page_token, location_name)
         if not next_page_token:
             break
-        time.sleep(2)
+        if not _replay:
+            time.sleep(2)
 
+    if with_status:
+        return all_reviews, location_name, status
     return all_reviews, location_name
 
 
+# Status con los que la API rechaza un next_page_token vencido al retomar una descarga
+TOKEN_EXPIRED_STATUSES = {"INVALID_REQUEST", "NOT_FOUND"}
+
+
+def fetch_reviews_resumable(place_id, journal, key, language=""):
+    """
+    Descarga las reseñas de un lugar anotando cada página en 'journal' (JobJournal) bajo 'key'.
+    Si hubo una ejecución interrumpida, continúa desde la última página guardada; si el
+    token guardado ya venció (TOKEN_EXPIRED_STATUSES), descarta el avance parcial y vuelve
+    a descargar desde la primera página.
+    Retorna:
+      (list_of_reviews, location_name, status), como fetch_reviews con with_status=True.
+    """
+    previous, token, previous_name = journal.partial(key) or ([], None, None)
+    if previous and not token:
+        # Ya se habían descargado todas las páginas antes de la interrupción
+        return previous, previous_name, "OK"
+
+    def on_page(page, next_token, name):
+        journal.record_page(key, page, next_token, name)
+
+    reviews, location_name, status = fetch_reviews(place_id, language=language, page_token=token,
+                                                   on_page=on_page, with_status=True)
+    if token and status in TOKEN_EXPIRED_STATUSES:
+        journal.reset_partial(key)
+        previous, previous_name = [], None
+        reviews, location_name, status = fetch_reviews(place_id, language=language, on_page=on_page,
+                                                       with_status=True)
+    return previous + reviews, previous_name or location_name, status
+
+
+def parse_reviews(place_id, location_name, raw_reviews, language=""):
+    """
+    Convierte las reseñas de una respuesta de la Places Details API en dicts
+    (review_id, place_id, location_name, author_name, rating, datetime_utc, text, language).
+    """
+    page_reviews = []
+    for r in raw_reviews:
+        utime = r.get("time")
+        dt_utc = None
+        if utime:
+            dt_utc = datetime.utcfromtimestamp(utime).strftime("%Y-%m-%d %H:%M:%S")
+        review_item = {
+            "review_id": make_review_id(place_id, r.get("author_name"), dt_utc),
+            "place_id": place_id,
+            "location_name": location_name,
+            "author_name": r.get("author_name"),
+            "rating": r.get("rating"),
+            "datetime_utc": dt_utc,
+            "text": r.get("text", ""),
+            "language": language
+        }
+        page_reviews.append(review_item)
+    return page_reviews
+
+
+def make_review_id(place_id, author_name, datetime_utc):
+    """
+    Genera un identificador estable para una reseña a partir del lugar, el autor y la fecha.
+    """
+    raw = f"{place_id}|{author_name}|{datetime_utc}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _review_key(review):
+    """
+    Clave para identificar una misma reseña devuelta en distintos idiomas:
+    el autor y la fecha/hora de publicación no cambian con la traducción.
+    """
+    return review.get("place_id"), review.get("author_name"), review.get("datetime_utc")
+
+
+def fetch_reviews_multilang(place_id, languages=("es", "en"), with_status=False):
+    """
+    Descarga reseñas de un place_id en varios idiomas de forma concurrente y
+    las combina eliminando duplicados por autor y fecha.
+    Parámetros:
+      place_id (str): ID del lugar en Google
+      languages (iterable): Códigos de idioma a consultar, en orden de preferencia.
+                            Si una reseña aparece en varios idiomas se conserva
+                            la versión del primer idioma de la lista.
+      with_status (bool): Si es True, también retorna el estado de la descarga ("OK" solo
+                          si todos los idiomas se descargaron completos; ver fetch_reviews).
+    Retorna:
+      (list_of_reviews, location_name), o (list_of_reviews, location_name, status) con with_status=True.
+    """
+    languages = list(dict.fromkeys(languages))
+    if not place_id or not languages:
+        return ([], "", "INVALID_REQUEST") if with_status else ([], "")
+
+    with ThreadPoolExecutor(max_workers=len(languages)) as executor:
+        results = list(executor.map(lambda lang: fetch_reviews(place_id, language=lang, with_status=True), languages))
+
+    merged = []
+    seen = set()
+    location_name = "Unknown"
+    status = next((lang_status for _, _, lang_status in results if lang_status != "OK"), "OK")
+    for revs, loc_name, _ in results:
+        if location_name == "Unknown" and loc_name:
+            location_name = loc_name
+        for review in revs:
+            key = _review_key(review)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(review)
+
+    if with_status:
+        return merged, location_name, status
+    return merged, location_name
+
+
+@single_flight(lambda place_id: place_id)
 def fetch_general_place_data(place_id):
     """
     Extrae información general de un lugar (rating, total reseñas, ubicación, etc.)
@@ -110,8 +324,7 @@ def fetch_general_place_data(place_id):
     }
 
     try:
-        resp = requests.get(url, params=params)
-        data = resp.json()
+        data = _get_json("details", url, params)
         if data.get("status") != "OK":
             return {}
         result = data.get("result", {})
@@ -133,3 +346,136 @@ def fetch_general_place_data(place_id):
     except Exception as e:
         print(f"[ERROR] fetch_general_place_data: {e}")
         return {}
+
+
+# Nearby Search devuelve como máximo 3 páginas de 20 resultados por consulta
+NEARBY_RESULT_CAP = 60
+NEARBY_MAX_RADIUS_M = 50000
+
+
+def nearby_search(lat, lng, radius, place_type="", keyword=""):
+    """
+    Consulta la Places Nearby Search API alrededor de un punto, recorriendo todas las páginas.
+    Parámetros:
+      lat, lng (float): Centro de la búsqueda.
+      radius (float): Radio en metros (máximo 50 000).
+      place_type (str): Tipo de lugar de Google ("restaurant", "cafe", etc.). Opcional.
+      keyword (str): Palabra clave adicional. Opcional.
+    Retorna:
+      Lista de dicts con place_id, name, vicinity, lat y lng.
+    """
+    url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    params = {
+        "key": API_KEY,
+        "location": f"{lat},{lng}",
+        "radius": int(min(radius, NEARBY_MAX_RADIUS_M))
+    }
+    if place_type:
+        params["type"] = place_type
+    if keyword:
+        params["keyword"] = keyword
+
+    places = []
+    while True:
+        try:
+            data = _get_json("nearby", url, params)
+        except Exception as e:
+            print(f"[ERROR] nearby_search: {e}")
+            break
+
+        if data.get("status") != "OK":
+            break
+
+        for r in data.get("results", []):
+            location = r.get("geometry", {}).get("location", {})
+            places.append({
+                "place_id": r.get("place_id"),
+                "name": r.get("name"),
+                "vicinity": r.get("vicinity"),
+                "lat": location.get("lat"),
+                "lng": location.get("lng")
+            })
+
+        next_page_token = data.get("next_page_token")
+        if not next_page_token:
+            break
+        # El token tarda unos segundos en activarse; la siguiente página solo lleva el token
+        if not _replay:
+            time.sleep(2)
+        params = {"key": API_KEY, "pagetoken": next_page_token}
+
+    return places
+
+
+def _split_tile(tile):
+    south, west, north, east, depth = tile
+    mid_lat = (south + north) / 2
+    mid_lng = (west + east) / 2
+    return [
+        (south, west, mid_lat, mid_lng, depth + 1),
+        (south, mid_lng, mid_lat, east, depth + 1),
+        (mid_lat, west, north, mid_lng, depth + 1),
+        (mid_lat, mid_lng, north, east, depth + 1)
+    ]
+
+
+def _search_tile(tile, place_type, keyword):
+    """
+    Ejecuta una Nearby Search con el círculo que cubre el rectángulo de la celda.
+    """
+    south, west, north, east, _ = tile
+    lat = (south + north) / 2
+    lng = (west + east) / 2
+    # Semidiagonal de la celda en metros
+    dy = (north - south) * 111320 / 2
+    dx = (east - west) * 111320 * math.cos(math.radians(lat)) / 2
+    return nearby_search(lat, lng, math.hypot(dx, dy), place_type=place_type, keyword=keyword)
+
+
+def discover_places(bbox, place_type="", keyword="", grid_size=4, max_depth=3, max_workers=8):
+    """
+    Descubre lugares dentro de un rectángulo geográfico dividiéndolo en celdas y
+    lanzando una Nearby Search por celda en paralelo.
+    Las celdas que alcanzan el tope de resultados de la API se subdividen en 4
+    (hasta 'max_depth' niveles), de modo que solo se hacen más consultas donde hace falta.
+    Parámetros:
+      bbox (tuple): (south, west, north, east) en grados.
+      place_type (str): Tipo de lugar de Google. Opcional.
+      keyword (str): Palabra clave. Opcional.
+      grid_size (int): Celdas por lado de la cuadrícula inicial.
+      max_depth (int): Niveles máximos de subdivisión.
+      max_workers (int): Consultas simultáneas.
+    Retorna:
+      Lista de dicts (place_id, name, vicinity, lat, lng) sin duplicados.
+    """
+    south, west, north, east = bbox
+    step_lat = (north - south) / grid_size
+    step_lng = (east - west) / grid_size
+    tiles = [
+        (south + i * step_lat, west + j * step_lng, south + (i + 1) * step_lat, west + (j + 1) * step_lng, 0)
+        for i in range(grid_size)
+        for j in range(grid_size)
+    ]
+
+    seen = set()
+    discovered = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(_search_tile, tile, place_type, keyword): tile for tile in tiles}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                tile = pending.pop(future)
+                results = future.result()
+                # Los círculos de búsqueda se solapan y se salen del rectángulo:
+                # se descartan repetidos y lugares fuera de la zona
+                for place in results:
+                    inside = (place["lat"] is not None and place["lng"] is not None
+                              and south <= place["lat"] <= north and west <= place["lng"] <= east)
+                    if inside and place["place_id"] and place["place_id"] not in seen:
+                        seen.add(place["place_id"])
+                        discovered.append(place)
+                if len(results) >= NEARBY_RESULT_CAP and tile[4] < max_depth:
+                    for child in _split_tile(tile):
+                        pending[executor.submit(_search_tile, child, place_type, keyword)] = child
+
+    return discovered
@@ -0,0 +1,178 @@
+"""
+Módulo: rollups.py
+Agregados precalculados por lugar y día (conteo de reseñas, ratings, sentimientos y
+términos más frecuentes), actualizados de forma incremental para graficar tendencias
+sin volver a recorrer todas las reseñas.
+"""
+
+import os
+import threading
+from collections import Counter
+
+import pandas as pd
+
+from src.text_index import tokenize
+
+# Términos por lugar y día que se conservan en el agregado de palabras
+TOP_TERMS_PER_DAY = 20
+
+# Palabras muy comunes (español e inglés) que no aportan a las tendencias
+STOPWORDS = {
+    "de", "la", "que", "el", "en", "y", "a", "los", "se", "del", "las", "un", "por", "con", "no",
+    "una", "su", "para", "es", "al", "lo", "como", "más", "pero", "sus", "le", "ya", "o", "muy",
+    "me", "si", "mi", "fue", "son", "hay", "todo", "esta", "este", "está", "the", "and", "to",
+    "of", "a", "i", "is", "was", "it", "in", "for", "we", "my", "they", "you", "with", "that",
+    "this", "but", "are", "on", "at", "be", "have", "had", "so", "not", "very", "there", "our"
+}
+
+DAILY_COLUMNS = ["place_id", "date", "location_name", "n_reviews", "rating_sum", "rating_count",
+                 "n_positive", "n_neutral", "n_negative"]
+TERM_COLUMNS = ["place_id", "date", "term", "count"]
+
+
+class RollupStore:
+    """
+    Agregados diarios por lugar guardados en 'path' (daily.csv, terms.csv y seen_ids.txt).
+    Las reseñas ya contabilizadas se recuerdan por review_id para no sumarlas dos veces.
+    """
+
+    def __init__(self, path="data/rollups"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.daily = self._read("daily.csv", DAILY_COLUMNS)
+        self.terms = self._read("terms.csv", TERM_COLUMNS)
+        self.seen_ids = set()
+        seen_path = os.path.join(path, "seen_ids.txt")
+        if os.path.exists(seen_path):
+            with open(seen_path, encoding="utf-8") as f:
+                self.seen_ids = {line.strip() for line in f if line.strip()}
+
+    def _read(self, name, columns):
+        file_path = os.path.join(self.path, name)
+        if os.path.exists(file_path):
+            return pd.read_csv(file_path, parse_dates=["date"])
+        return pd.DataFrame(columns=columns)
+
+    def update(self, df):
+        """
+        Suma a los agregados las reseñas de 'df' que no se hayan contabilizado antes.
+        Parámetros:
+          df (DataFrame): Reseñas con review_id, place_id, location_name, rating,
+                          datetime_utc, sentiment y text_clean.
+        Retorna:
+          Cantidad de reseñas nuevas agregadas.
+        """
+        with self._lock:
+            new = df[~df["review_id"].isin(self.seen_ids)].copy()
+            new["date"] = pd.to_datetime(new["datetime_utc"], errors="coerce").dt.normalize()
+            new = new.dropna(subset=["date"])
+            if new.empty:
+                return 0
+
+            sentiment = new["sentiment"]
+            new["n_positive"] = (sentiment == "positive").astype(int)
+            new["n_neutral"] = (sentiment == "neutral").astype(int)
+            new["n_negative"] = (sentiment == "negative").astype(int)
+            daily_new = new.groupby(["place_id", "date"]).agg(
+                location_name=("location_name", "last"),
+                n_reviews=("review_id", "size"),
+                rating_sum=("rating", "sum"),
+                rating_count=("rating", "count"),
+                n_positive=("n_positive", "sum"),
+                n_neutral=("n_neutral", "sum"),
+                n_negative=("n_negative", "sum")
+            ).reset_index()
+            self.daily = self._merge(self.daily, daily_new, ["place_id", "date"], location_col=True)
+
+            term_rows = []
+            for (place_id, date), texts in new.groupby(["place_id", "date"])["text_clean"]:
+                counts = Counter(
+                    token for text in texts.dropna() for token in tokenize(text)
+                    if token not in STOPWORDS and len(token) > 2
+                )
+                term_rows.extend((place_id, date, term, count) for term, count in counts.items())
+            if term_rows:
+                terms_new = pd.DataFrame(term_rows, columns=TERM_COLUMNS)
+                terms = self._merge(self.terms, terms_new, ["place_id", "date", "term"])
+                # Solo se conservan los términos más frecuentes de cada lugar y día
+                self.terms = (terms.sort_values("count", ascending=False)
+                              .groupby(["place_id", "date"]).head(TOP_TERMS_PER_DAY)
+                              .reset_index(drop=True))
+
+            self.seen_ids.update(new["review_id"])
+            self._save(new["review_id"])
+            return len(new)
+
+    @staticmethod
+    def _merge(current, new, keys, location_col=False):
+        if current.empty:
+            return new
+        combined = pd.concat([current, new], ignore_index=True)
+        sums = combined.groupby(keys).sum(numeric_only=True)
+        if location_col:
+            sums["location_name"] = combined.groupby(keys)["location_name"].last()
+        return sums.reset_index()[list(current.columns)]
+
+    def _save(self, new_ids):
+        os.makedirs(self.path, exist_ok=True)
+        self.daily.to_csv(os.path.join(self.path, "daily.csv"), index=False)
+        self.terms.to_csv(os.path.join(self.path, "terms.csv"), index=False)
+        with open(os.path.join(self.path, "seen_ids.txt"), "a", encoding="utf-8") as f:
+            f.writelines(f"{review_id}\n" for review_id in new_ids)
+
+    def place_labels(self):
+        """
+        Nombre para mostrar de cada lugar: su location_name más reciente. Si dos lugares
+        distintos tienen el mismo nombre (p. ej. sucursales), se agrega el final del place_id.
+        Retorna:
+          Series place_id -> etiqueta única.
+        """
+        if self.daily.empty:
+            return pd.Series(dtype=object)
+        names = self.daily.sort_values("date").groupby("place_id")["location_name"].last().astype(str)
+        repeated = names.duplicated(keep=False)
+        names[repeated] = names[repeated] + " (" + names.index[repeated].str[-6:] + ")"
+        return names
+
+    def trend(self, place_ids=None, freq="D"):
+        """
+        Serie de tiempo a partir del agregado diario, agrupada por place_id (un lugar que
+        cambió de nombre es una sola serie y dos lugares homónimos son series distintas).
+        Parámetros:
+          place_ids (list): Lugares a incluir (None = todos).
+          freq (str): "D" (día) o "W" (semana).
+        Retorna:
+          DataFrame con place_id, location_name (etiqueta de place_labels), period,
+          n_reviews, avg_rating y pct_positive.
+        """
+        daily = self.daily
+        if place_ids:
+            daily = daily[daily["place_id"].isin(place_ids)]
+        if daily.empty:
+            return pd.DataFrame(columns=["place_id", "location_name", "period", "n_reviews", "avg_rating",
+                                         "pct_positive"])
+        period = daily["date"].dt.to_period(freq).dt.start_time
+        grouped = daily.groupby([daily["place_id"], period.rename("period")]).agg(
+            n_reviews=("n_reviews", "sum"),
+            rating_sum=("rating_sum", "sum"),
+            rating_count=("rating_count", "sum"),
+            n_positive=("n_positive", "sum")
+        )
+        grouped["avg_rating"] = grouped["rating_sum"] / grouped["rating_count"].where(grouped["rating_count"] > 0)
+        grouped["pct_positive"] = grouped["n_positive"] / grouped["n_reviews"] * 100
+        result = grouped[["n_reviews", "avg_rating", "pct_positive"]].reset_index()
+        result.insert(1, "location_name", result["place_id"].map(self.place_labels()))
+        return result
+
+    def top_terms(self, place_ids=None, start=None, end=None, n=15):
+        """
+        Términos más frecuentes en un rango de fechas (a partir del agregado de términos).
+        """
+        terms = self.terms
+        if place_ids:
+            terms = terms[terms["place_id"].isin(place_ids)]
+        if start is not None:
+            terms = terms[terms["date"] >= pd.Timestamp(start)]
+        if end is not None:
+            terms = terms[terms["date"] <= pd.Timestamp(end)]
+        return terms.groupby("term")["count"].sum().nlargest(n)
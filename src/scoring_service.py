@@ -0,0 +1,256 @@
+"""
+Módulo: scoring_service.py
+Servicio local opcional que mantiene cargados los modelos de limpieza y sentimiento,
+para que cada proceso nuevo (Streamlit, scripts por lotes) no pague la importación y el
+calentamiento de TextBlob.
+
+Protocolo: una línea JSON por solicitud y por respuesta (NDJSON) sobre un socket Unix o TCP.
+  -> {"id": 1, "op": "score", "texts": [...], "languages": [...]}
+  <- {"id": 1, "result": [[polarity, subjectivity], ...]}
+Operaciones: "score" (score_sentiment_batch), "analyze" (analyze_sentiment), "clean" (clean_text).
+El cliente puede enviar varias solicitudes sin esperar respuesta (pipelining); el servidor
+responde en el mismo orden.
+
+Iniciar el servicio:
+  python -m src.scoring_service unix:/tmp/gmaps_scoring.sock
+y usarlo desde otros procesos con SCORING_SERVICE=unix:/tmp/gmaps_scoring.sock
+(también acepta "host:puerto"). Sin SCORING_SERVICE todo se calcula en el mismo proceso.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+DEFAULT_ADDRESS = "unix:/tmp/gmaps_scoring.sock"
+SERVICE_ADDRESS = os.getenv("SCORING_SERVICE", "")
+# Textos por solicitud al dividir un lote grande
+CHUNK_SIZE = 500
+# Si el servicio no responde, no se vuelve a intentar durante este tiempo
+RETRY_AFTER_SECONDS = 30
+
+_local = threading.local()
+_unavailable_until = 0.0
+_disabled = False
+
+
+def _after_fork():
+    # Un proceso hijo no debe compartir el socket del padre: abre su propia conexión
+    global _local
+    _local = threading.local()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+class ServiceUnavailable(Exception):
+    """
+    El servicio no está configurado o no respondió; se debe calcular en el proceso.
+    """
+
+
+def _parse_address(address):
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    if address.startswith("/"):
+        return socket.AF_UNIX, address
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def disable_remote():
+    """
+    Desactiva el uso del servicio en este proceso (lo usa el propio servidor).
+    """
+    global _disabled
+    _disabled = True
+
+
+def is_configured():
+    return bool(SERVICE_ADDRESS) and not _disabled and time.time() >= _unavailable_until
+
+
+class ScoringClient:
+    """
+    Conexión a un servicio de calificación. No es segura entre hilos: se usa una por hilo.
+    """
+
+    def __init__(self, address, timeout=60):
+        family, target = _parse_address(address)
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(target)
+        self._reader = self._sock.makefile("rb")
+        self._next_id = 0
+
+    def call_many(self, requests):
+        """
+        Envía varias solicitudes seguidas y retorna sus resultados en el mismo orden.
+        El envío corre en otro hilo para no bloquearse si el servidor ya está respondiendo.
+        Si el servidor responde con error a alguna solicitud, se leen igual todas las respuestas
+        (la conexión queda lista para la siguiente llamada) y se lanza RuntimeError.
+        """
+        ids = []
+        lines = []
+        for request in requests:
+            self._next_id += 1
+            ids.append(self._next_id)
+            lines.append(json.dumps(dict(request, id=self._next_id), ensure_ascii=False).encode("utf-8") + b"\n")
+
+        send_error = []
+
+        def send():
+            try:
+                for line in lines:
+                    self._sock.sendall(line)
+            except OSError as e:
+                send_error.append(e)
+
+        sender = threading.Thread(target=send, daemon=True)
+        sender.start()
+        results = []
+        errors = []
+        for expected_id in ids:
+            line = self._reader.readline()
+            if not line:
+                raise ConnectionError(send_error[0] if send_error else "El servicio cerró la conexión")
+            response = json.loads(line)
+            if response.get("id") != expected_id:
+                raise ConnectionError("Respuesta fuera de orden del servicio")
+            if "error" in response:
+                errors.append(response["error"])
+            else:
+                results.append(response["result"])
+        sender.join()
+        if errors:
+            raise RuntimeError(errors[0])
+        return results
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+
+def _client():
+    client = getattr(_local, "client", None)
+    if client is None:
+        client = _local.client = ScoringClient(SERVICE_ADDRESS)
+    return client
+
+
+def remote_map(op, texts, languages=None):
+    """
+    Ejecuta 'op' en el servicio sobre una lista de textos, dividida en solicitudes de
+    CHUNK_SIZE textos enviadas en pipeline.
+    Retorna:
+      Lista de resultados (uno por texto).
+    Lanza ServiceUnavailable si el servicio no está configurado o falla.
+    """
+    global _unavailable_until
+    if not is_configured():
+        raise ServiceUnavailable()
+    requests = []
+    for start in range(0, len(texts), CHUNK_SIZE):
+        request = {"op": op, "texts": list(texts[start:start + CHUNK_SIZE])}
+        if languages is not None:
+            request["languages"] = list(languages[start:start + CHUNK_SIZE])
+        requests.append(request)
+    try:
+        chunks = _client().call_many(requests)
+    except (OSError, ConnectionError, ValueError) as e:
+        # Conexión rota o servicio caído: se descarta la conexión y se usa el proceso local
+        client = getattr(_local, "client", None)
+        if client is not None:
+            client.close()
+            _local.client = None
+        _unavailable_until = time.time() + RETRY_AFTER_SECONDS
+        raise ServiceUnavailable(str(e)) from e
+    except RuntimeError as e:
+        # El servicio respondió con error (la conexión sigue en buen estado): se calcula en el proceso
+        raise ServiceUnavailable(str(e)) from e
+    return [item for chunk in chunks for item in chunk]
+
+
+# ----------------------------------------------------------------------------------
+# Servidor
+# ----------------------------------------------------------------------------------
+def _ops():
+    # Se importan aquí: el cliente no debe cargar los modelos
+    from src.sentiment_analysis import score_sentiment_batch, analyze_sentiment
+    from src.text_processing import clean_text
+
+    def score(request):
+        texts = request["texts"]
+        return [list(score) for score in score_sentiment_batch(texts, request.get("languages") or [""] * len(texts))]
+
+    def analyze(request):
+        return [analyze_sentiment(text) for text in request["texts"]]
+
+    def clean(request):
+        languages = request.get("languages") or [""] * len(request["texts"])
+        return [clean_text(text, lang) for text, lang in zip(request["texts"], languages)]
+
+    return {"score": score, "analyze": analyze, "clean": clean}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        ops = self.server.ops
+        # Las solicitudes de una conexión se atienden en orden; la siguiente ya puede estar en el búfer
+        for line in self.rfile:
+            request_id = None
+            try:
+                request = json.loads(line)
+                request_id = request.get("id")
+                response = {"id": request_id, "result": ops[request["op"]](request)}
+            except Exception as e:
+                response = {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(address=DEFAULT_ADDRESS):
+    """
+    Inicia el servicio (bloquea hasta Ctrl+C). Los modelos se calientan antes de aceptar conexiones.
+    """
+    disable_remote()
+    ops = _ops()
+    start = time.time()
+    ops["score"]({"texts": ["the food was great", "la comida estaba muy rica"], "languages": ["en", "es"]})
+    ops["clean"]({"texts": ["¡Hola! Café"]})
+    print(f"[INFO] Modelos listos en {time.time() - start:.1f} s")
+
+    family, target = _parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(target):
+            os.remove(target)  # Socket de una ejecución anterior
+        server = _UnixServer(target, _Handler)
+    else:
+        server = _TCPServer(target, _Handler)
+    server.ops = ops
+    print(f"[INFO] Servicio de calificación escuchando en {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if family == socket.AF_UNIX and os.path.exists(target):
+            os.remove(target)
+
+
+if __name__ == "__main__":
+    # Uso: python -m src.scoring_service [unix:/ruta.sock | host:puerto]
+    serve(sys.argv[1] if len(sys.argv) > 1 else (SERVICE_ADDRESS or DEFAULT_ADDRESS))
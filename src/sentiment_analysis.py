@@ -1,9 +1,69 @@
 """
 Módulo: sentiment_analysis.py
-Función para analizar el sentimiento del texto usando TextBlob.
+Funciones para analizar el sentimiento del texto usando TextBlob.
+Además de la etiqueta, se exponen los puntajes de polaridad y subjetividad para
+poder guardarlos y volver a etiquetar con otros umbrales sin recalcular.
+TextBlob solo entiende inglés; las reseñas en español se califican con un léxico propio
+(ver score_sentiment_batch, que agrupa las reseñas por idioma).
+Si está configurado un servicio de calificación (SCORING_SERVICE, ver scoring_service.py),
+analyze_sentiment y score_sentiment_batch lo usan; si no responde, se calcula aquí.
 """
 
-from textblob import TextBlob
+import re
+
+import numpy as np
+
+from src.language_detection import group_by_language
+from src.scoring_service import remote_map, ServiceUnavailable
+
+# Umbrales por defecto de polaridad para etiquetar
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+
+def score_sentiment(text):
+    """
+    Calcula los puntajes de sentimiento del texto.
+    Parámetros:
+      text (str): Texto a analizar.
+    Retorna:
+      (polarity, subjectivity): polaridad en [-1, 1] y subjetividad en [0, 1].
+      Para texto vacío retorna (0.0, 0.0).
+    """
+    if not text:
+        return 0.0, 0.0
+    # Importación diferida: los procesos que usan el servicio de calificación no cargan TextBlob
+    from textblob import TextBlob
+    sentiment = TextBlob(text).sentiment
+    return sentiment.polarity, sentiment.subjectivity
+
+
+def label_from_polarity(polarity, positive_threshold=POSITIVE_THRESHOLD, negative_threshold=NEGATIVE_THRESHOLD):
+    """
+    Convierte una polaridad en etiqueta ('positive', 'negative' o 'neutral').
+    """
+    if polarity > positive_threshold:
+        return "positive"
+    elif polarity < negative_threshold:
+        return "negative"
+    else:
+        return "neutral"
+
+
+def label_polarities(polarities, positive_threshold=POSITIVE_THRESHOLD, negative_threshold=NEGATIVE_THRESHOLD):
+    """
+    Versión vectorizada de label_from_polarity para muchas polaridades a la vez
+    (lista, arreglo de numpy o Series de pandas).
+    Retorna:
+      np.array de etiquetas.
+    """
+    values = np.asarray(polarities, dtype=float)
+    return np.select(
+        [values > positive_threshold, values < negative_threshold],
+        ["positive", "negative"],
+        default="neutral"
+    )
+
 
 def analyze_sentiment(text):
     """
@@ -17,11 +77,113 @@ def analyze_sentiment(text):
     """
     if not text:
         return "neutral"
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity
-    if polarity > 0.1:
-        return "positive"
-    elif polarity < -0.1:
-        return "negative"
-    else:
-        return "neutral"
+    try:
+        return remote_map("analyze", [text])[0]
+    except ServiceUnavailable:
+        pass
+    polarity, _ = score_sentiment(text)
+    return label_from_polarity(polarity)
+
+
+# Léxico de polaridad en español (palabra -> polaridad en [-1, 1])
+SPANISH_LEXICON = {
+    "excelente": 1.0, "excelentes": 1.0, "delicioso": 0.9, "deliciosa": 0.9, "deliciosos": 0.9,
+    "rico": 0.7, "rica": 0.7, "ricos": 0.7, "ricas": 0.7, "bueno": 0.6, "buena": 0.6, "buenos": 0.6,
+    "buenas": 0.6, "mejor": 0.7, "mejores": 0.7, "increíble": 0.9, "increible": 0.9, "genial": 0.8,
+    "perfecto": 1.0, "perfecta": 1.0, "amable": 0.6, "amables": 0.6, "agradable": 0.6, "limpio": 0.5,
+    "limpia": 0.5, "recomiendo": 0.7, "recomendable": 0.7, "encantó": 0.8, "encanta": 0.8,
+    "bonito": 0.5, "bonita": 0.5, "rápido": 0.4, "rapido": 0.4, "sabroso": 0.8, "sabrosa": 0.8,
+    "fresco": 0.4, "fresca": 0.4, "justo": 0.3, "atentos": 0.6, "atento": 0.6, "volveré": 0.6,
+    "volveremos": 0.6, "gracias": 0.4, "maravilloso": 1.0, "espectacular": 0.9, "feliz": 0.7,
+    "malo": -0.6, "mala": -0.6, "malos": -0.6, "malas": -0.6, "pésimo": -1.0, "pesimo": -1.0,
+    "pésima": -1.0, "pesima": -1.0, "horrible": -1.0, "terrible": -1.0, "peor": -0.8,
+    "sucio": -0.6, "sucia": -0.6, "frío": -0.4, "fría": -0.4, "fria": -0.4, "frio": -0.4,
+    "lento": -0.5, "lenta": -0.5, "caro": -0.4, "cara": -0.4, "caros": -0.4, "grosero": -0.8,
+    "grosera": -0.8, "groseros": -0.8, "tardaron": -0.4, "quemado": -0.6, "quemada": -0.6,
+    "desagradable": -0.7, "decepción": -0.7, "decepcion": -0.7, "asco": -1.0,
+    "insípido": -0.6, "insipido": -0.6, "ruidoso": -0.4, "robo": -0.8,
+    "gustó": 0.6, "gusto": 0.5, "gustaron": 0.6,
+    # Formas apocopadas y adverbios ("muy buen servicio", "todo muy bien", "gran lugar")
+    "buen": 0.6, "bien": 0.5, "gran": 0.6, "mal": -0.6, "fatal": -0.8,
+    "buenísimo": 0.9, "buenisimo": 0.9, "buenísima": 0.9, "buenisima": 0.9,
+    "riquísimo": 0.9, "riquisimo": 0.9, "riquísima": 0.9, "riquisima": 0.9,
+    "malísimo": -0.9, "malisimo": -0.9, "malísima": -0.9, "malisima": -0.9,
+    "recomendado": 0.6, "recomendada": 0.6
+}
+_SPANISH_NEGATIONS = {"no", "ni", "nunca", "jamás", "jamas", "tampoco"}
+_SPANISH_INTENSIFIERS = {"muy": 1.3, "super": 1.3, "súper": 1.3, "bastante": 1.2, "demasiado": 1.2, "poco": 0.6}
+_WORD_RE = re.compile(r"\w+")
+# Palabras que alcanza una negación o intensificador ("no me gustó")
+_MODIFIER_WINDOW = 3
+
+
+def score_sentiment_spanish(text):
+    """
+    Calcula (polarity, subjectivity) de un texto en español con el léxico SPANISH_LEXICON.
+    Las negaciones invierten la palabra siguiente y los intensificadores la amplifican.
+    """
+    words = _WORD_RE.findall((text or "").lower())
+    if not words:
+        return 0.0, 0.0
+    scores = []
+    modifier = 1.0
+    window = 0
+    for word in words:
+        if word in _SPANISH_NEGATIONS:
+            modifier *= -1.0
+            window = _MODIFIER_WINDOW
+            continue
+        if word in _SPANISH_INTENSIFIERS:
+            modifier *= _SPANISH_INTENSIFIERS[word]
+            window = _MODIFIER_WINDOW
+            continue
+        if word in SPANISH_LEXICON:
+            scores.append(SPANISH_LEXICON[word] * modifier)
+            modifier, window = 1.0, 0
+            continue
+        window -= 1
+        if window <= 0:
+            modifier = 1.0
+    if not scores:
+        return 0.0, 0.0
+    polarity = float(np.clip(np.mean(scores), -1.0, 1.0))
+    subjectivity = min(1.0, len(scores) / len(words) * 3)
+    return polarity, subjectivity
+
+
+def _score_batch_textblob(texts):
+    return [score_sentiment(text) for text in texts]
+
+
+def _score_batch_spanish(texts):
+    return [score_sentiment_spanish(text) for text in texts]
+
+
+# Calificador por idioma; los idiomas sin entrada usan TextBlob
+SENTIMENT_BACKENDS = {
+    "en": _score_batch_textblob,
+    "es": _score_batch_spanish,
+}
+
+
+def score_sentiment_batch(texts, languages):
+    """
+    Calcula (polarity, subjectivity) para varios textos, enviando cada grupo de textos del
+    mismo idioma a su calificador en un solo llamado.
+    Parámetros:
+      texts (list): Textos limpios.
+      languages (list): Código de idioma de cada texto (p. ej. de detect_languages).
+    Retorna:
+      Lista de (polarity, subjectivity) en el mismo orden que 'texts'.
+    """
+    if texts:
+        try:
+            return [tuple(score) for score in remote_map("score", texts, languages)]
+        except ServiceUnavailable:
+            pass
+    results = [(0.0, 0.0)] * len(texts)
+    for lang, positions in group_by_language(languages).items():
+        backend = SENTIMENT_BACKENDS.get(lang, _score_batch_textblob)
+        for position, score in zip(positions, backend([texts[p] for p in positions])):
+            results[position] = score
+    return results
@@ -0,0 +1,199 @@
+"""
+Módulo: sql_engine.py
+Motor SQL analítico (DuckDB, en el mismo proceso) sobre las reseñas y lugares guardados
+en data/last5perplace y data/general_info.
+
+Los CSV se cargan una sola vez en una base columnar (data/warehouse.duckdb); refresh() solo
+agrega los archivos nuevos. Las consultas se ejecutan en DuckDB y solo el resultado llega a
+pandas, sin cargar todas las reseñas en memoria.
+
+Tablas:
+  reviews          Todas las filas de todos los CSV de reseñas (con la columna source_file)
+  places           Todas las filas de todos los CSV de información general
+  reviews_latest   Una fila por reseña (la del archivo más reciente)
+  places_latest    Una fila por lugar (la del archivo más reciente)
+Las tablas *_latest se recalculan en refresh() para que las consultas no tengan que deduplicar.
+
+Las consultas de query() corren en una conexión de solo lectura y sin acceso a archivos ni a
+la red (enable_external_access=false, configuración bloqueada), así que una consulta del panel
+no puede modificar la base ni leer archivos del servidor. refresh() abre una conexión de
+escritura solo mientras carga archivos nuevos.
+
+Requiere el paquete duckdb (pip install duckdb).
+"""
+
+import glob
+import os
+import threading
+
+try:
+    import duckdb
+except ImportError:  # Dependencia opcional: el resto de la app funciona sin ella
+    duckdb = None
+
+REVIEWS_GLOB = "data/last5perplace/*.csv"
+PLACES_GLOB = "data/general_info/*.csv"
+WAREHOUSE_PATH = "data/warehouse.duckdb"
+
+# Solo se permiten consultas SELECT desde query()
+_READ_ONLY_STATEMENTS = {"SELECT"}
+# Configuración de la conexión de consultas: sin archivos externos y sin poder cambiarla con SET
+_QUERY_CONFIG = {"enable_external_access": False, "lock_configuration": True}
+
+# Tipos declarados de las columnas conocidas: sin ellos DuckDB los infiere de cada archivo y un
+# archivo con ratings enteros crearía la columna como BIGINT (3.5 se guardaría como 4). Las demás
+# columnas se siguen infiriendo.
+COLUMN_TYPES = {
+    "reviews": {
+        "review_id": "VARCHAR", "place_id": "VARCHAR", "location_name": "VARCHAR", "author_name": "VARCHAR",
+        "rating": "DOUBLE", "text": "VARCHAR", "language": "VARCHAR", "text_clean": "VARCHAR",
+        "detected_language": "VARCHAR", "polarity": "DOUBLE", "subjectivity": "DOUBLE", "sentiment": "VARCHAR",
+        "duplicate_of": "VARCHAR",
+    },
+    "places": {
+        "place_id": "VARCHAR", "name": "VARCHAR", "rating": "DOUBLE", "user_ratings_total": "BIGINT",
+        "formatted_address": "VARCHAR", "types": "VARCHAR", "lat": "DOUBLE", "lng": "DOUBLE",
+        "phone": "VARCHAR", "website": "VARCHAR", "price_level": "DOUBLE",
+    },
+}
+
+_LATEST_TABLES = {
+    "reviews": """
+        CREATE OR REPLACE TABLE reviews_latest AS
+        SELECT * FROM reviews
+        QUALIFY row_number() OVER (
+            PARTITION BY coalesce(CAST(review_id AS VARCHAR),
+                                  concat_ws('|', place_id, author_name, CAST(datetime_utc AS VARCHAR)))
+            ORDER BY source_file DESC
+        ) = 1
+    """,
+    "places": """
+        CREATE OR REPLACE TABLE places_latest AS
+        SELECT * FROM places
+        QUALIFY row_number() OVER (PARTITION BY place_id ORDER BY source_file DESC) = 1
+    """,
+}
+
+
+def is_available():
+    return duckdb is not None
+
+
+class SQLEngine:
+    """
+    Base DuckDB con las reseñas y lugares recopilados. Segura para usarse desde varios hilos.
+    DuckDB no permite abrir el mismo archivo con configuraciones distintas en un proceso, por
+    eso la conexión de consultas se cierra mientras refresh() escribe y las consultas esperan.
+    """
+
+    def __init__(self, db_path=WAREHOUSE_PATH, reviews_glob=REVIEWS_GLOB, places_glob=PLACES_GLOB):
+        if duckdb is None:
+            raise ImportError("El motor SQL requiere el paquete duckdb (pip install duckdb)")
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.sources = {"reviews": reviews_glob, "places": places_glob}
+        self._lock = threading.Lock()
+        writer = duckdb.connect(db_path)
+        try:
+            writer.execute("CREATE TABLE IF NOT EXISTS _loaded_files (path VARCHAR PRIMARY KEY, tbl VARCHAR)")
+        finally:
+            writer.close()
+        self._con = self._connect_read_only()
+
+    def _connect_read_only(self):
+        return duckdb.connect(self.db_path, read_only=True, config=_QUERY_CONFIG)
+
+    @staticmethod
+    def _has_table(con, table):
+        return con.execute(
+            "SELECT count(*) FROM information_schema.tables WHERE table_name = ?", [table]
+        ).fetchone()[0] > 0
+
+    def _load_files(self, con, table, paths):
+        source = "read_csv(?, union_by_name = true, filename = 'source_file', header = true"
+        # read_csv rechaza tipos de columnas que no están en los archivos: solo se declaran las presentes
+        columns = {row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {source})", [paths]).fetchall()}
+        types = {name: dtype for name, dtype in COLUMN_TYPES[table].items() if name in columns}
+        source, params = (f"{source}, types = ?)", [paths, types]) if types else (f"{source})", [paths])
+        if not self._has_table(con, table):
+            con.execute(f"CREATE TABLE {table} AS SELECT * FROM {source}", params)
+        else:
+            # Los archivos nuevos pueden traer columnas que la tabla aún no tiene, y una tabla creada
+            # antes de declarar los tipos puede tener una columna con el tipo inferido
+            existing = {row[0]: row[1] for row in con.execute(f"DESCRIBE {table}").fetchall()}
+            for name, dtype, *_ in con.execute(f"DESCRIBE SELECT * FROM {source}", params).fetchall():
+                if name not in existing:
+                    con.execute(f'ALTER TABLE {table} ADD COLUMN "{name}" {dtype}')
+                elif name in types and existing[name] != dtype:
+                    con.execute(f'ALTER TABLE {table} ALTER COLUMN "{name}" TYPE {dtype}')
+            con.execute(f"INSERT INTO {table} BY NAME SELECT * FROM {source}", params)
+        con.execute(_LATEST_TABLES[table])
+        con.executemany("INSERT INTO _loaded_files VALUES (?, ?)", [[path, table] for path in paths])
+
+    def refresh(self):
+        """
+        Carga los CSV que aún no están en la base.
+        Retorna:
+          Cantidad de archivos nuevos cargados.
+        """
+        with self._lock:
+            known = {row[0] for row in self._con.execute("SELECT path FROM _loaded_files").fetchall()}
+            pending = {}
+            for table, pattern in self.sources.items():
+                paths = sorted(os.path.abspath(path) for path in glob.glob(pattern))
+                new_paths = [path for path in paths if path not in known]
+                if new_paths:
+                    pending[table] = new_paths
+            if not pending:
+                return 0
+
+            self._con.close()
+            try:
+                writer = duckdb.connect(self.db_path)
+                try:
+                    for table, new_paths in pending.items():
+                        writer.execute("BEGIN TRANSACTION")
+                        try:
+                            self._load_files(writer, table, new_paths)
+                            writer.execute("COMMIT")
+                        except Exception:
+                            writer.execute("ROLLBACK")
+                            raise
+                finally:
+                    writer.close()
+            finally:
+                self._con = self._connect_read_only()
+        return sum(len(paths) for paths in pending.values())
+
+    def query(self, sql, params=None):
+        """
+        Ejecuta una consulta SELECT en la conexión de solo lectura y retorna el resultado
+        como DataFrame.
+        Lanza ValueError si no es una única sentencia SELECT.
+        """
+        statements = duckdb.extract_statements(sql)
+        if len(statements) != 1:
+            raise ValueError("Escribe exactamente una consulta")
+        if statements[0].type.name not in _READ_ONLY_STATEMENTS:
+            raise ValueError("Solo se permiten consultas de lectura (SELECT)")
+        # Con el candado tomado: refresh() no puede cerrar la conexión durante la consulta
+        with self._lock:
+            cursor = self._con.cursor()
+            try:
+                return cursor.execute(sql, params or []).df()
+            finally:
+                cursor.close()
+
+    def tables(self):
+        """
+        Tablas disponibles con sus columnas: {nombre: [columnas]}.
+        """
+        with self._lock:
+            rows = self._con.execute(
+                "SELECT table_name, column_name FROM information_schema.columns "
+                "WHERE table_name NOT LIKE '\\_%' ESCAPE '\\' ORDER BY table_name, ordinal_position"
+            ).fetchall()
+        result = {}
+        for table, column in rows:
+            result.setdefault(table, []).append(column)
+        return result
@@ -0,0 +1,222 @@
+"""
+Módulo: text_index.py
+Índice invertido sobre el texto limpio de las reseñas (token -> reseñas y posiciones),
+construido de forma incremental y guardado en disco, con consultas booleanas y por frase.
+
+En disco el índice es un directorio de segmentos de solo-agregar: cada save() escribe un
+segmento solo con las reseñas agregadas desde el anterior, y al cargar se combinan todos.
+Los segmentos se fusionan por tamaño (como un contador binario: un segmento se fusiona con
+el anterior cuando tiene al menos tantas reseñas), así que cada reseña se reescribe pocas
+veces y la cantidad de archivos crece de forma logarítmica.
+"""
+
+import glob
+import heapq
+import os
+import pickle
+import re
+import threading
+
+from src.text_processing import clean_text
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r'"([^"]+)"|(\S+)')
+
+# Datos de cada reseña que se guardan junto al índice para mostrar resultados
+DOC_FIELDS = ("place_id", "location_name", "author_name", "rating", "datetime_utc", "sentiment", "polarity", "text_clean")
+
+
+def tokenize(text):
+    """
+    Divide un texto ya limpio en tokens (palabras y números).
+    """
+    return TOKEN_RE.findall(text or "")
+
+
+class InvertedIndex:
+    """
+    Índice invertido de reseñas.
+      - postings: {token: {review_id: [posiciones]}}
+      - docs: {review_id: {campos de DOC_FIELDS}}
+    Si se indica 'path' (directorio), el índice se carga de sus segmentos y save() agrega uno
+    nuevo.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.postings = {}
+        self.docs = {}
+        # Reseñas agregadas desde el último save(), con el mismo formato que un segmento
+        self._pending = {"postings": {}, "docs": {}}
+        self._lock = threading.Lock()
+        if path:
+            for _, _, segment_path in self._segments():
+                with open(segment_path, "rb") as f:
+                    self._merge_into(self, pickle.load(f))
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _segment_path(self, seq, n_docs):
+        return os.path.join(self.path, f"{seq:08d}-{n_docs}.pkl")
+
+    def _segments(self):
+        """
+        Segmentos en disco: lista de (secuencia, reseñas, ruta) en orden de escritura.
+        """
+        segments = []
+        for segment_path in glob.glob(os.path.join(self.path, "*.pkl")):
+            seq, _, n_docs = os.path.basename(segment_path)[:-len(".pkl")].partition("-")
+            if seq.isdigit() and n_docs.isdigit():
+                segments.append((int(seq), int(n_docs), segment_path))
+        return sorted(segments)
+
+    @staticmethod
+    def _merge_into(target, data):
+        # Combinar es idempotente: una reseña repetida en dos segmentos queda igual
+        target.docs.update(data["docs"])
+        for token, postings in data["postings"].items():
+            target.postings.setdefault(token, {}).update(postings)
+
+    def add_reviews(self, reviews):
+        """
+        Agrega al índice las reseñas que todavía no estén indexadas.
+        Parámetros:
+          reviews (iterable): dicts con 'review_id' y 'text_clean' (o 'text').
+        Retorna:
+          Cantidad de reseñas nuevas indexadas.
+        """
+        added = 0
+        with self._lock:
+            for review in reviews:
+                review_id = review.get("review_id")
+                if not review_id or review_id in self.docs:
+                    continue
+                text = review.get("text_clean")
+                if not isinstance(text, str):
+                    text = clean_text(review.get("text") or "")
+                self.docs[review_id] = {field: review.get(field) for field in DOC_FIELDS}
+                self.docs[review_id]["text_clean"] = text
+                if self.docs[review_id]["datetime_utc"] is not None:
+                    self.docs[review_id]["datetime_utc"] = str(self.docs[review_id]["datetime_utc"])
+                self._pending["docs"][review_id] = self.docs[review_id]
+                for position, token in enumerate(tokenize(text)):
+                    positions = self.postings.setdefault(token, {}).setdefault(review_id, [])
+                    positions.append(position)
+                    self._pending["postings"].setdefault(token, {})[review_id] = positions
+                added += 1
+        return added
+
+    @staticmethod
+    def _write_segment(segment_path, data):
+        # Escritura atómica mediante un archivo temporal
+        tmp_path = segment_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, segment_path)
+
+    def save(self):
+        """
+        Guarda en un segmento nuevo las reseñas agregadas desde el último save()
+        y fusiona los segmentos pequeños.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            if not self._pending["docs"]:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            segments = self._segments()
+            seq = segments[-1][0] + 1 if segments else 0
+            self._write_segment(self._segment_path(seq, len(self._pending["docs"])), self._pending)
+            self._pending = {"postings": {}, "docs": {}}
+            self._compact()
+
+    def _compact(self):
+        # Debe llamarse con _lock tomado. Fusiona el último segmento con el anterior
+        # mientras el último tenga al menos tantas reseñas.
+        segments = self._segments()
+        while len(segments) >= 2 and segments[-1][1] >= segments[-2][1]:
+            (_, _, older_path), (seq, _, newer_path) = segments[-2], segments[-1]
+            merged = InvertedIndex()
+            for segment_path in (older_path, newer_path):
+                with open(segment_path, "rb") as f:
+                    self._merge_into(merged, pickle.load(f))
+            merged_path = self._segment_path(seq, len(merged.docs))
+            if merged_path != newer_path:
+                self._write_segment(merged_path, {"postings": merged.postings, "docs": merged.docs})
+                os.remove(newer_path)
+            os.remove(older_path)
+            segments = self._segments()
+
+    def _term(self, token):
+        return set(self.postings.get(token, ()))
+
+    def _phrase(self, tokens):
+        if not tokens:
+            return set()
+        if len(tokens) == 1:
+            return self._term(tokens[0])
+        # Candidatas: reseñas que contienen todos los tokens
+        lists = [self.postings.get(token, {}) for token in tokens]
+        candidates = set.intersection(*(set(p) for p in lists))
+        matches = set()
+        for review_id in candidates:
+            starts = set(lists[0][review_id])
+            for offset, postings in enumerate(lists[1:], start=1):
+                starts &= {pos - offset for pos in postings[review_id]}
+                if not starts:
+                    break
+            if starts:
+                matches.add(review_id)
+        return matches
+
+    def _doc_date(self, review_id):
+        return self.docs[review_id].get("datetime_utc") or ""
+
+    def search(self, query, limit=None):
+        """
+        Busca reseñas que cumplan la consulta.
+        Sintaxis:
+          - palabras separadas por espacio: deben aparecer todas (AND)
+          - "frase entre comillas": las palabras deben aparecer juntas y en orden
+          - OR: separa alternativas
+          - NOT palabra o -palabra: excluye reseñas que la contengan
+        Parámetros:
+          limit (int): Máximo de reseñas a retornar (las más recientes). Opcional.
+        Retorna:
+          Lista de dicts (campos de DOC_FIELDS + review_id), ordenada por fecha descendente.
+        """
+        groups = [[]]
+        negate = False
+        for phrase, word in QUERY_RE.findall(query or ""):
+            if word == "OR":
+                groups.append([])
+                continue
+            if word == "NOT":
+                negate = True
+                continue
+            if word.startswith("-") and len(word) > 1:
+                negate, word = True, word[1:]
+            tokens = tokenize(clean_text(phrase or word))
+            if tokens:
+                groups[-1].append((negate, tokens))
+            negate = False
+
+        with self._lock:
+            result = set()
+            for group in groups:
+                positives = [self._phrase(tokens) for neg, tokens in group if not neg]
+                if not positives:
+                    continue
+                matches = set.intersection(*positives)
+                for neg, tokens in group:
+                    if neg:
+                        matches -= self._phrase(tokens)
+                result |= matches
+            # Solo se arman las filas de las 'limit' reseñas más recientes
+            if limit:
+                top = heapq.nlargest(limit, result, key=self._doc_date)
+            else:
+                top = sorted(result, key=self._doc_date, reverse=True)
+            return [dict(self.docs[review_id], review_id=review_id) for review_id in top]
@@ -4,23 +4,82 @@ Función para limpiar texto de reseñas, eliminando saltos de línea, caracteres
 """
 
 import re
+import unicodedata
 
-def clean_text(text):
+# Puntuación básica que se conserva en todos los idiomas
+BASIC_PUNCTUATION = "¡!¿?.,:;'\"()-"
+
+# Marcas diacríticas combinantes (acentos que quedan separados tras normalizar) y bloques
+# índicos y tailandés completos, cuyos signos vocálicos no cuentan como letras en \w
+_COMBINING_MARKS = "\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f\u0900-\u0dff\u0e00-\u0e7f"
+# Emojis y pictogramas (incluye el selector de variación y el unificador ZWJ)
+_EMOJI = "\U0001f000-\U0001faff\u2600-\u27bf\u2b00-\u2bff\ufe0f\u200d"
+
+# Símbolos de compatibilidad comunes en texto en español e inglés que NFKC convertiría en
+# letras, números o puntuación (1º -> 1o, m² -> m2, ½ -> 12, … -> ...): se eliminan antes de
+# normalizar, como hacía la versión anterior. Incluye ordinales, acentos sueltos, superíndices
+# y subíndices, símbolos tipo letra (™, ℃, №) y formas numéricas (fracciones, números romanos).
+_COMPAT_SYMBOLS = re.compile(
+    "[¨ª¯²³´µ¸¹º¼½¾\u2017\u2024-\u2026\u203c\u203e\u2047-\u2049\u2070-\u209f\u20a8\u2100-\u2129\u212b-\u218f]"
+)
+
+# Puntuación adicional que se conserva según el idioma de la reseña
+LANGUAGE_EXTRA_CHARS = {
+    "fr": "«»",
+    "de": "„“",
+    "it": "«»",
+    "pt": "«»",
+}
+
+# Camino rápido para texto ASCII: solo letras, números, puntuación básica y espacios
+_ASCII_DISALLOWED = re.compile(r"[^a-z0-9" + re.escape(BASIC_PUNCTUATION) + r"\s]")
+
+_cleaners = {}
+
+
+def _disallowed_pattern(extra_chars="", keep_emoji=True):
+    """
+    Expresión regular (precompilada) con todo lo que NO se conserva:
+    se permiten letras y números de cualquier alfabeto, marcas diacríticas,
+    puntuación básica, espacios y, opcionalmente, emojis. El guion bajo se elimina.
+    """
+    allowed = r"\w\s" + _COMBINING_MARKS + re.escape(BASIC_PUNCTUATION + extra_chars)
+    if keep_emoji:
+        allowed += _EMOJI
+    return re.compile(r"[^" + allowed + r"]|_")
+
+
+def _get_pattern(language):
+    pattern = _cleaners.get(language)
+    if pattern is None:
+        pattern = _cleaners[language] = _disallowed_pattern(LANGUAGE_EXTRA_CHARS.get(language, ""))
+    return pattern
+
+
+def clean_text(text, language=""):
     """
     Limpia el texto aplicando los siguientes pasos:
-      - Elimina saltos de línea.
+      - Elimina símbolos de compatibilidad (º, ª, ², ½, …) y normaliza Unicode (NFKC),
+        p. ej. ligaduras y anchos completos.
       - Convierte a minúsculas.
-      - Elimina caracteres no permitidos (solo letras, números, y puntuación básica).
-      - Quita espacios extra.
+      - Elimina caracteres no permitidos: se conservan letras de cualquier idioma
+        (con sus acentos), números, puntuación básica y emojis.
+      - Convierte saltos de línea en espacios y quita espacios extra.
+    Para texto ASCII se usa un camino rápido sin normalización.
     Parámetros:
       text (str): Texto a limpiar.
+      language (str): Código de idioma ("es", "en", "fr", ...). Agrega la puntuación
+                      propia del idioma definida en LANGUAGE_EXTRA_CHARS. Opcional.
     Retorna:
       Texto limpio (str).
     """
     if not text:
         return ""
-    text = text.replace("\n", " ").replace("\r", " ")
-    text = text.lower()
-    text = re.sub(r"[^a-z0-9áéíóúüñ¡!¿?.,:;'\"()\s-]", "", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    if text.isascii():
+        text = _ASCII_DISALLOWED.sub("", text.lower())
+    else:
+        text = _COMPAT_SYMBOLS.sub("", text)
+        if not unicodedata.is_normalized("NFKC", text):
+            text = unicodedata.normalize("NFKC", text)
+        text = _get_pattern(language).sub("", text.lower())
+    return " ".join(text.split())
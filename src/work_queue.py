@@ -0,0 +1,297 @@
+"""
+Módulo: work_queue.py
+Cola de trabajos persistente (SQLite) para repartir la descarga y el análisis de lugares
+entre varios procesos trabajadores, en una o varias máquinas que compartan el archivo.
+
+Cada trabajo se "arrienda" (lease) por un tiempo limitado; si el trabajador muere sin
+terminarlo, el arriendo vence y otro trabajador lo retoma. Los trabajos que fallan se
+reintentan hasta 'max_attempts' veces.
+
+Uso desde la terminal:
+  python -m src.work_queue enqueue --db data/queue.db pid1 pid2 ...
+  python -m src.work_queue worker --db data/queue.db --out data/queue_results
+  python -m src.work_queue status --db data/queue.db
+
+Nota: SQLite depende del bloqueo de archivos del sistema operativo; para varias máquinas
+el archivo debe estar en un sistema de archivos compartido con bloqueo confiable.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    place_id TEXT NOT NULL,
+    language TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    result_path TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, lease_expires);
+"""
+
+
+class WorkQueue:
+    """
+    Cola de trabajos sobre un archivo SQLite. Estados: pending, leased, done, failed.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # isolation_level=None: las transacciones se controlan explícitamente con BEGIN
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, place_ids, language="", max_attempts=3):
+        """
+        Agrega trabajos para cada place_id. Se omiten los que ya estén pendientes o en curso
+        con el mismo idioma.
+        Retorna:
+          Cantidad de trabajos nuevos.
+        """
+        now = time.time()
+        added = 0
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for place_id in dict.fromkeys(place_ids):
+                exists = conn.execute(
+                    "SELECT 1 FROM jobs WHERE place_id = ? AND language = ? AND status IN ('pending', 'leased')",
+                    (place_id, language)
+                ).fetchone()
+                if exists:
+                    continue
+                conn.execute(
+                    "INSERT INTO jobs (place_id, language, max_attempts, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (place_id, language, max_attempts, now, now)
+                )
+                added += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return added
+
+    def lease(self, worker_id, lease_seconds=300):
+        """
+        Toma el siguiente trabajo disponible (pendiente o con arriendo vencido).
+        Los trabajos vencidos que ya agotaron sus intentos se marcan como 'failed'.
+        Retorna:
+          dict con los datos del trabajo, o None si no hay trabajos disponibles.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', last_error = 'lease expired', updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, now)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def _update_owned(self, job_id, worker_id, sql, params):
+        # Solo el dueño actual del arriendo puede modificar el trabajo
+        conn = self._connect()
+        try:
+            cursor = conn.execute(sql + " WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                                  (*params, job_id, worker_id))
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id, worker_id, lease_seconds=300):
+        """
+        Extiende el arriendo de un trabajo en curso. Retorna False si el arriendo ya se perdió.
+        """
+        now = time.time()
+        return self._update_owned(job_id, worker_id, "UPDATE jobs SET lease_expires = ?, updated_at = ?",
+                                  (now + lease_seconds, now))
+
+    def complete(self, job_id, worker_id, result_path):
+        """
+        Marca un trabajo como terminado y guarda la ruta de su resultado.
+        """
+        return self._update_owned(job_id, worker_id,
+                                  "UPDATE jobs SET status = 'done', result_path = ?, lease_owner = NULL, updated_at = ?",
+                                  (result_path, time.time()))
+
+    def fail(self, job_id, worker_id, error):
+        """
+        Registra un error. El trabajo vuelve a 'pending' si le quedan intentos, o queda 'failed'.
+        """
+        return self._update_owned(
+            job_id, worker_id,
+            "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END, "
+            "last_error = ?, lease_owner = NULL, updated_at = ?",
+            (str(error)[:1000], time.time())
+        )
+
+    def stats(self):
+        """
+        Cantidad de trabajos por estado.
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        return {row["status"]: row["n"] for row in rows}
+
+
+def process_job(job, output_dir):
+    """
+    Descarga, limpia y analiza un lugar, y guarda el resultado en un archivo JSON.
+    El idioma "es+en" descarga varios idiomas y combina las reseñas.
+    Retorna:
+      Ruta del archivo de resultado.
+    """
+    # Se importan aquí para que la cola pueda usarse sin las dependencias de la API
+    from src.reviews_fetcher import fetch_reviews, fetch_reviews_multilang, fetch_general_place_data
+    from src.pipeline import enrich_reviews
+
+    place_id, language = job["place_id"], job["language"]
+    if "+" in language:
+        reviews, _, status = fetch_reviews_multilang(place_id, languages=language.split("+"), with_status=True)
+    else:
+        reviews, _, status = fetch_reviews(place_id, language=language, with_status=True)
+    # Un error de cuota o de red no debe marcar el trabajo como terminado: se lanza para reintentarlo
+    if status != "OK":
+        raise RuntimeError(f"Descarga de reseñas incompleta para place_id={place_id} (status={status})")
+    general_info = fetch_general_place_data(place_id)
+    if not general_info:
+        raise RuntimeError(f"Sin información general para place_id={place_id}")
+    reviews = enrich_reviews(reviews)
+
+    os.makedirs(output_dir, exist_ok=True)
+    safe_language = language.replace("+", "_") or "default"
+    result_path = os.path.join(output_dir, f"{place_id}_{safe_language}.json")
+    tmp_path = f"{result_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"place_id": place_id, "language": language, "general": general_info, "reviews": reviews},
+                  f, ensure_ascii=False)
+    os.replace(tmp_path, result_path)
+    return result_path
+
+
+def run_worker(db_path, output_dir, worker_id=None, lease_seconds=300, poll_interval=5, stop_when_empty=False):
+    """
+    Ciclo de un trabajador: toma trabajos de la cola, los procesa y registra el resultado.
+    Parámetros:
+      db_path (str): Archivo SQLite de la cola.
+      output_dir (str): Carpeta donde se escriben los resultados (compartida entre máquinas).
+      worker_id (str): Identificador del trabajador (por defecto, host + pid).
+      lease_seconds (int): Duración del arriendo de cada trabajo.
+      poll_interval (float): Segundos de espera cuando la cola está vacía.
+      stop_when_empty (bool): Si es True, termina cuando no hay trabajos disponibles.
+    Retorna:
+      Cantidad de trabajos completados.
+    """
+    queue = WorkQueue(db_path)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    completed = 0
+    while True:
+        job = queue.lease(worker_id, lease_seconds)
+        if job is None:
+            if stop_when_empty:
+                return completed
+            time.sleep(poll_interval)
+            continue
+        print(f"[INFO] {worker_id}: procesando place_id={job['place_id']} (intento {job['attempts']})")
+        # Renueva el arriendo mientras el trabajo sigue en curso (lugares con muchas páginas)
+        stop = threading.Event()
+
+        def keep_alive(job_id=job["id"]):
+            while not stop.wait(lease_seconds / 3):
+                queue.heartbeat(job_id, worker_id, lease_seconds)
+
+        keeper = threading.Thread(target=keep_alive, daemon=True)
+        keeper.start()
+        try:
+            result_path = process_job(job, output_dir)
+        except Exception as e:
+            print(f"[ERROR] {worker_id}: place_id={job['place_id']}: {e}")
+            queue.fail(job["id"], worker_id, e)
+            continue
+        finally:
+            stop.set()
+            keeper.join()
+        if queue.complete(job["id"], worker_id, result_path):
+            completed += 1
+        else:
+            print(f"[WARNING] {worker_id}: el arriendo de place_id={job['place_id']} venció antes de terminar")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cola de trabajos de descarga y análisis de reseñas")
+    parser.add_argument("--db", default="data/queue.db", help="Archivo SQLite de la cola")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_enqueue = sub.add_parser("enqueue", help="Agregar place_ids a la cola")
+    p_enqueue.add_argument("place_ids", nargs="+")
+    p_enqueue.add_argument("--language", default="", help='Código de idioma, o varios unidos con "+" (p. ej. es+en)')
+    p_enqueue.add_argument("--max-attempts", type=int, default=3)
+
+    p_worker = sub.add_parser("worker", help="Ejecutar un trabajador")
+    p_worker.add_argument("--out", default="data/queue_results", help="Carpeta de resultados")
+    p_worker.add_argument("--lease-seconds", type=int, default=300)
+    p_worker.add_argument("--once", action="store_true", help="Terminar cuando la cola esté vacía")
+
+    sub.add_parser("status", help="Mostrar trabajos por estado")
+
+    args = parser.parse_args(argv)
+    if args.command == "enqueue":
+        added = WorkQueue(args.db).enqueue(args.place_ids, args.language, args.max_attempts)
+        print(f"[INFO] Se agregaron {added} trabajo(s) a la cola.")
+    elif args.command == "worker":
+        done = run_worker(args.db, args.out, lease_seconds=args.lease_seconds, stop_when_empty=args.once)
+        print(f"[INFO] Trabajos completados: {done}")
+    else:
+        print(json.dumps(WorkQueue(args.db).stats(), indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
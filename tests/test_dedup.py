@@ -0,0 +1,34 @@
+import os
+
+from src.dedup import MinHashIndex
+
+TEXTS = [
+    "la comida estuvo deliciosa y el servicio fue muy rápido y amable",
+    "el lugar es pequeño pero muy limpio y los precios son justos",
+    "pedimos pizza y llegó fría después de una hora de espera",
+]
+
+
+def test_save_appends_segments_and_reloads(tmp_path):
+    path = str(tmp_path / "minhash")
+    index = MinHashIndex(path)
+    index.check_and_add(["r1", "r2"], TEXTS[:2])
+    index.save()
+    first = sorted(os.listdir(path))
+    index.check_and_add(["r3"], TEXTS[2:])
+    index.save()
+    # Los segmentos se fusionan por tamaño: 2 firmas + 1 firma quedan en dos archivos
+    assert first == ["00000000-2.npz"]
+    assert sorted(os.listdir(path)) == ["00000000-2.npz", "00000001-1.npz"]
+    index.check_and_add(["r4"], [TEXTS[0] + " volveremos"])
+    index.save()
+    assert sorted(os.listdir(path)) == ["00000002-4.npz"]
+
+    reloaded = MinHashIndex(path)
+    assert reloaded.ids == ["r1", "r2", "r3", "r4"]
+    assert (reloaded.signatures == index.signatures).all()
+    # Un casi duplicado se detecta contra el histórico cargado de los segmentos
+    assert reloaded.check_and_add(["r5"], [TEXTS[1]]) == ["r2"]
+    # Guardar sin firmas nuevas no escribe segmentos
+    MinHashIndex(path).save()
+    assert sorted(os.listdir(path)) == ["00000002-4.npz"]
@@ -0,0 +1,18 @@
+import pandas as pd
+
+from src import exports
+
+
+def test_dataset_hash_with_unhashable_cells():
+    df = pd.DataFrame({"place_id": ["P1", "P2"], "types": [["cafe", "food"], ["bar"]]})
+    same = pd.DataFrame({"place_id": ["P1", "P2"], "types": [["cafe", "food"], ["bar"]]})
+    changed = pd.DataFrame({"place_id": ["P1", "P2"], "types": [["cafe"], ["bar"]]})
+
+    assert exports.dataset_hash(df) == exports.dataset_hash(same)
+    assert exports.dataset_hash(df) != exports.dataset_hash(changed)
+    assert exports.build_export(df) == exports.build_export(same)
+
+
+def test_parquet_requires_an_engine(monkeypatch):
+    monkeypatch.setattr(exports.importlib.util, "find_spec", lambda name: None)
+    assert exports.available_formats() == ["csv"]
@@ -0,0 +1,29 @@
+import numpy as np
+
+from src import language_detection
+from src.language_detection import LANGUAGES, detect_languages
+
+
+def _dense_reference(texts):
+    # Versión anterior (matriz densa textos x vocabulario) para comparar resultados
+    counts = np.zeros((len(texts), len(language_detection._VOCAB_INDEX)))
+    for row, text in enumerate(texts):
+        for gram in language_detection._ngrams(text or ""):
+            col = language_detection._VOCAB_INDEX.get(gram)
+            if col is not None:
+                counts[row, col] += 1
+    best = (counts @ language_detection._LOG_PROBS.T).argmax(axis=1)
+    return [LANGUAGES[b] if n >= language_detection.MIN_NGRAMS else "" for b, n in zip(best, counts.sum(axis=1))]
+
+
+def test_matches_dense_reference():
+    texts = ["la comida estaba muy rica", "the service was terrible", "", None, "ok", "café",
+             "excelente atención, volveremos", "great tacos and friendly staff"]
+    result = detect_languages(texts)
+    assert result == _dense_reference(texts)
+    assert result[0] == "es" and result[1] == "en"
+    assert result[2] == result[3] == result[4] == ""
+
+
+def test_empty_batch():
+    assert detect_languages([]) == []
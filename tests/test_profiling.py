@@ -0,0 +1,25 @@
+import time
+
+from src import profiling
+
+
+def _work():
+    time.sleep(0.001)
+
+
+def test_stats_are_kept_per_session():
+    for session in ("a", "b"):
+        with profiling.stage("etapa", True, session):
+            # Las etapas anidadas y las estadísticas de procesos hijos van a la sesión exterior
+            with profiling.stage("interna"):
+                _work()
+            profiling.merge_exported({"hijo": ([1, 0.5], None)})
+
+    assert {row["stage"] for row in profiling.stage_summary("a")} == {"etapa", "interna", "hijo"}
+    assert profiling.top_functions("interna", session="a")
+
+    profiling.reset_stats("a")
+    assert profiling.stage_summary("a") == []
+    assert [row["runs"] for row in profiling.stage_summary("b") if row["stage"] == "interna"] == [1]
+    assert profiling.stage_summary() == []
+    profiling.reset_stats("b")
@@ -0,0 +1,24 @@
+from datetime import datetime, timezone
+
+from src.raw_archive import RawArchive
+
+
+def _payload(name):
+    return {"status": "OK", "result": {"name": name}}
+
+
+def test_lookup_as_of_compares_instants(tmp_path):
+    archive = RawArchive(str(tmp_path))
+    params = {"place_id": "p1", "fields": "name"}
+    archive.append("details", params, _payload("mañana"),
+                   fetched_at=datetime(2024, 5, 1, 9, 30, tzinfo=timezone.utc))
+    archive.append("details", params, _payload("junio"),
+                   fetched_at=datetime(2024, 6, 1, tzinfo=timezone.utc))
+    # Una fecha sin hora incluye todo ese día
+    assert archive.lookup("details", params, as_of="2024-05-01")["result"]["name"] == "mañana"
+    assert archive.lookup("details", params, as_of="2024-04-30") is None
+    # Otra zona horaria: 2024-05-01T08:00-03:00 es 11:00 UTC
+    assert archive.lookup("details", params, as_of="2024-05-01T08:00:00-03:00")["result"]["name"] == "mañana"
+    assert archive.lookup("details", params, as_of="2024-05-01T06:00:00-03:00") is None
+    assert archive.lookup("details", params, as_of="2024-05-01T09:30Z")["result"]["name"] == "mañana"
+    assert archive.lookup("details", params)["result"]["name"] == "junio"
@@ -0,0 +1,29 @@
+import os
+import threading
+
+from src.result_cache import ResultCache
+
+
+def test_concurrent_set_same_key_on_disk(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path))
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def worker(n):
+        barrier.wait()
+        try:
+            for _ in range(20):
+                cache.set("P1|es", {"reviews": list(range(2000)), "writer": n})
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(os.listdir(tmp_path)) == 1
+    # Una instancia nueva (sin memoria) lee la entrada completa desde disco
+    assert ResultCache(disk_dir=str(tmp_path)).get("P1|es")["reviews"] == list(range(2000))
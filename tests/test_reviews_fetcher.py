@@ -0,0 +1,45 @@
+import src.reviews_fetcher as reviews_fetcher
+from src.job_journal import JobJournal
+
+
+class _Response:
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def _review(author):
+    return {"author_name": author, "rating": 5, "time": 1700000000, "text": "Muy buen servicio"}
+
+
+def test_expired_page_token_restarts_from_first_page(tmp_path, monkeypatch):
+    path = str(tmp_path / "job.jsonl")
+    # Ejecución interrumpida: se guardó la primera página y un token que ya venció
+    JobJournal(path).record_page("P1", [{"review_id": "viejo"}], "token-vencido", "Lugar")
+    requested_tokens = []
+
+    def fake_get(url, params=None, **kwargs):
+        requested_tokens.append(params.get("pagetoken"))
+        if params.get("pagetoken") == "token-vencido":
+            return _Response({"status": "INVALID_REQUEST"})
+        if params.get("pagetoken") is None:
+            return _Response({"status": "OK", "next_page_token": "t2",
+                              "result": {"name": "Lugar", "reviews": [_review("a")]}})
+        return _Response({"status": "OK", "result": {"name": "Lugar", "reviews": [_review("b")]}})
+
+    monkeypatch.setattr(reviews_fetcher.requests, "get", fake_get)
+    monkeypatch.setattr(reviews_fetcher.time, "sleep", lambda seconds: None)
+
+    journal = JobJournal(path)
+    reviews, location_name, status = reviews_fetcher.fetch_reviews_resumable("P1", journal, "P1")
+
+    assert status == "OK"
+    assert requested_tokens == ["token-vencido", None, "t2"]
+    assert [review["author_name"] for review in reviews] == ["a", "b"]
+    assert location_name == "Lugar"
+    # El descarte queda en la bitácora: al reabrirla solo están las páginas nuevas
+    reviews_saved, token, _ = JobJournal(path).partial("P1")
+    assert [review["author_name"] for review in reviews_saved] == ["a", "b"]
+    assert token is None
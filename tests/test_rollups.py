@@ -0,0 +1,34 @@
+import pandas as pd
+
+from src.rollups import RollupStore
+
+
+def _review(review_id, place_id, name, date, rating=5):
+    return {"review_id": review_id, "place_id": place_id, "location_name": name, "rating": rating,
+            "datetime_utc": date, "sentiment": "positive", "text_clean": "excelente café"}
+
+
+def test_trend_groups_by_place_id(tmp_path):
+    store = RollupStore(str(tmp_path / "rollups"))
+    store.update(pd.DataFrame([
+        _review("r1", "PLACE-AAAAAA", "Café Central", "2024-05-01"),
+        _review("r2", "PLACE-BBBBBB", "Café Central", "2024-05-01", rating=3),
+        # El mismo lugar cambió de nombre: sigue siendo una sola serie
+        _review("r3", "PLACE-CCCCCC", "Bar Viejo", "2024-05-01"),
+        _review("r4", "PLACE-CCCCCC", "Bar Nuevo", "2024-05-02"),
+    ]))
+
+    labels = store.place_labels()
+    assert labels.is_unique
+    assert labels["PLACE-CCCCCC"] == "Bar Nuevo"
+    assert labels["PLACE-AAAAAA"] == "Café Central (AAAAAA)"
+
+    trend = store.trend(freq="W")
+    assert len(trend) == 3
+    by_place = trend.set_index("place_id")
+    assert by_place.loc["PLACE-AAAAAA", "avg_rating"] == 5
+    assert by_place.loc["PLACE-BBBBBB", "avg_rating"] == 3
+    assert by_place.loc["PLACE-CCCCCC", "n_reviews"] == 2
+    assert by_place.loc["PLACE-CCCCCC", "location_name"] == "Bar Nuevo"
+    # Las etiquetas únicas permiten pivotear para la gráfica
+    assert trend.pivot(index="period", columns="location_name", values="n_reviews").shape == (1, 3)
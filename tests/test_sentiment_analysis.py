@@ -0,0 +1,20 @@
+import pytest
+
+from src.sentiment_analysis import SPANISH_LEXICON, _SPANISH_NEGATIONS, score_sentiment_spanish
+
+
+@pytest.mark.parametrize("text", ["muy buen servicio", "todo muy bien", "gran lugar", "la comida buenísima"])
+def test_common_positive_phrases(text):
+    polarity, subjectivity = score_sentiment_spanish(text)
+    assert polarity > 0.1
+    assert subjectivity > 0
+
+
+@pytest.mark.parametrize("text", ["muy mal servicio", "no está bien", "fatal la atención"])
+def test_common_negative_phrases(text):
+    polarity, _ = score_sentiment_spanish(text)
+    assert polarity < -0.1
+
+
+def test_negations_are_not_lexicon_entries():
+    assert not _SPANISH_NEGATIONS & SPANISH_LEXICON.keys()
@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("duckdb")
+
+from src.sql_engine import SQLEngine
+
+HEADER = "review_id,place_id,location_name,author_name,rating,datetime_utc,text\n"
+
+
+def test_fractional_ratings_are_kept(tmp_path):
+    reviews = tmp_path / "reviews"
+    reviews.mkdir()
+    # El primer archivo solo tiene ratings enteros: la columna no debe quedar como BIGINT
+    (reviews / "a.csv").write_text(HEADER + "r1,P1,Café,ana,4,2024-05-01 10:00:00,bueno\n", encoding="utf-8")
+    engine = SQLEngine(str(tmp_path / "warehouse.duckdb"), str(reviews / "*.csv"), str(tmp_path / "none" / "*.csv"))
+    assert engine.refresh() == 1
+
+    (reviews / "b.csv").write_text(HEADER + "r2,P1,Café,luis,3.5,2024-05-02 10:00:00,regular\n", encoding="utf-8")
+    assert engine.refresh() == 1
+
+    result = engine.query("SELECT review_id, rating FROM reviews_latest ORDER BY review_id")
+    assert result["rating"].tolist() == [4.0, 3.5]
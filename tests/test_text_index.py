@@ -0,0 +1,16 @@
+from src.text_index import InvertedIndex
+
+
+def _review(review_id, date, text):
+    return {"review_id": review_id, "place_id": "P1", "datetime_utc": date, "text_clean": text}
+
+
+def test_search_limit_returns_most_recent(tmp_path):
+    index = InvertedIndex(str(tmp_path / "index"))
+    index.add_reviews([_review(f"r{day}", f"2024-05-{day:02d}", "café rico") for day in range(1, 11)])
+    index.add_reviews([_review("otro", "2024-06-01", "pizza fría")])
+
+    assert [doc["review_id"] for doc in index.search("café", limit=3)] == ["r10", "r9", "r8"]
+    assert len(index.search("café")) == 10
+    assert [doc["review_id"] for doc in index.search("café OR pizza", limit=2)] == ["otro", "r10"]
+
@@ -0,0 +1,38 @@
+import json
+
+import src.reviews_fetcher as reviews_fetcher
+from src.work_queue import WorkQueue, run_worker
+
+
+class _Response:
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def test_quota_error_requeues_job(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_get(url, params=None, **kwargs):
+        calls.append(params.get("fields"))
+        if len(calls) == 1:
+            return _Response({"status": "OVER_QUERY_LIMIT"})
+        if params.get("fields") == "name,reviews":
+            return _Response({"status": "OK", "result": {"name": "Lugar", "reviews": [
+                {"author_name": "a", "rating": 5, "time": 1700000000, "text": "Muy buen servicio"}
+            ]}})
+        return _Response({"status": "OK", "result": {"name": "Lugar", "rating": 4.5}})
+
+    monkeypatch.setattr(reviews_fetcher.requests, "get", fake_get)
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue(["P1"], max_attempts=3)
+
+    completed = run_worker(str(tmp_path / "queue.db"), str(tmp_path / "out"), worker_id="w", stop_when_empty=True)
+
+    assert completed == 1
+    assert queue.stats() == {"done": 1}
+    result = json.loads((tmp_path / "out" / "P1_default.json").read_text(encoding="utf-8"))
+    assert len(result["reviews"]) == 1
+    assert result["general"]["name"] == "Lugar"